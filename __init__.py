@@ -23,19 +23,22 @@ from .basic.random_number_node import NODE_CLASS_MAPPINGS as RANDOM_NUMBER_MAPPI
 from .image.smart_resize_pad import NODE_CLASS_MAPPINGS as SMART_RESIZE_PAD_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as SMART_RESIZE_PAD_DISPLAY_MAPPINGS
 from .image import NODE_CLASS_MAPPINGS as IMAGE_INIT_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as IMAGE_INIT_DISPLAY_MAPPINGS
 from .api.ark_chat_node import NODE_CLASS_MAPPINGS as ARK_CHAT_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as ARK_CHAT_DISPLAY_MAPPINGS
+from .api.ark_job_nodes import NODE_CLASS_MAPPINGS as ARK_JOB_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as ARK_JOB_DISPLAY_MAPPINGS
 
 # =======================================
 # 导入精简版文本节点
 # =======================================
-from .text.text_utils_nodes import UniversalTextReplacer
+from .text.text_utils_nodes import UniversalTextReplacer, UniversalTextReplacerBatch
 
 # 定义新节点的映射
 TEXT_UTILS_NODE_CLASS_MAPPINGS = {
-    "UniversalTextReplacer": UniversalTextReplacer
+    "UniversalTextReplacer": UniversalTextReplacer,
+    "UniversalTextReplacerBatch": UniversalTextReplacerBatch,
 }
 
 TEXT_UTILS_NODE_DISPLAY_NAME_MAPPINGS = {
-    "UniversalTextReplacer": "通用文本替换"
+    "UniversalTextReplacer": "通用文本替换",
+    "UniversalTextReplacerBatch": "通用文本批量替换",
 }
 
 
@@ -63,6 +66,7 @@ NODE_CLASS_MAPPINGS = {
     **SMART_RESIZE_PAD_MAPPINGS,
     **IMAGE_INIT_MAPPINGS,
     **ARK_CHAT_CLASS_MAPPINGS,
+    **ARK_JOB_CLASS_MAPPINGS,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
@@ -89,6 +93,7 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     **SMART_RESIZE_PAD_DISPLAY_MAPPINGS,
     **IMAGE_INIT_DISPLAY_MAPPINGS,
     **ARK_CHAT_DISPLAY_MAPPINGS,
+    **ARK_JOB_DISPLAY_MAPPINGS,
 }
 
 WEB_DIRECTORY = os.path.join(os.path.dirname(os.path.realpath(__file__)), "js")
@@ -1,10 +1,21 @@
 import base64
+import hashlib
 import io
 import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-import numpy as np
+import torch
+import torch.nn.functional as F
 from PIL import Image
 
+from . import http_session
+from ..image.image_writer import quantize_frames
+from .response_cache import cache_key, get_response_cache
+
 
 ARK_CHAT_DEFAULT_URL = "https://ark.cn-beijing.volces.com/api/v3/responses"
 ARK_CHAT_COMPLETIONS_URL = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
@@ -44,6 +55,188 @@ def _extract_text(response_json):
     raise ValueError(f"Unexpected response: {response_json}")
 
 
+def _resolve_endpoint(api_key, api_url, model):
+    resolved_key = api_key.strip() or os.environ.get("ARK_API_KEY", "").strip()
+    if not resolved_key:
+        raise ValueError("Missing API key. Set api_key or ARK_API_KEY.")
+
+    resolved_url = api_url.strip() or os.environ.get("ARK_API_URL", "").strip() or ARK_CHAT_DEFAULT_URL
+    use_chat_completions = _use_chat_completions(resolved_url, model)
+    if not api_url.strip() and use_chat_completions:
+        resolved_url = ARK_CHAT_COMPLETIONS_URL
+    return resolved_key, resolved_url, use_chat_completions
+
+
+IMAGE_FORMATS = ["jpeg", "webp"]
+_MAX_ENCODED_IMAGES = 32
+# (形状, 最长边, 格式, uint8 像素哈希) -> data URL，同一张图重复请求时不再缩放与编码
+_encoded_images = OrderedDict()
+_encoded_images_lock = threading.Lock()
+
+
+def _encode_image_data_url(image, max_edge=2048, image_format="jpeg"):
+    """
+    把单张 [H, W, C] 图像编码为 data URL（质量 90）。
+
+    先量化为 uint8，按像素字节的哈希复用已编码的结果；最长边超过 max_edge 时（0 为不缩放）
+    在 uint8 张量上做抗锯齿 bicubic 缩放（torch 对 uint8 有专门的快速路径），再交给 PIL 编码。
+    """
+    started = time.perf_counter()
+    pixels = quantize_frames(image[..., :3].unsqueeze(0))
+    digest = hashlib.sha1(pixels).hexdigest()
+    key = (pixels.shape, max_edge, image_format, digest)
+    with _encoded_images_lock:
+        cached = _encoded_images.get(key)
+        if cached is not None:
+            _encoded_images.move_to_end(key)
+            return cached
+
+    height, width = pixels.shape[1], pixels.shape[2]
+    frame = pixels[0]
+    if max_edge and max(height, width) > max_edge:
+        scale = max_edge / max(height, width)
+        new_size = (max(1, round(height * scale)), max(1, round(width * scale)))
+        resized = F.interpolate(
+            torch.from_numpy(pixels).movedim(-1, 1), size=new_size, mode="bicubic", antialias=True, align_corners=False
+        )
+        frame = resized.movedim(1, -1)[0].contiguous().numpy()
+    pil_img = Image.fromarray(frame)
+
+    buffer = io.BytesIO()
+    pil_img.save(buffer, format=image_format.upper(), quality=90)
+    data = buffer.getvalue()
+    img_b64 = base64.b64encode(data).decode("utf-8")
+    data_url = f"data:image/{image_format};base64,{img_b64}"
+
+    elapsed = (time.perf_counter() - started) * 1000
+    print(
+        f"[ArkChatText] image {width}x{height} -> {pil_img.width}x{pil_img.height} "
+        f"{image_format} {len(data) / 1024:.0f} KB (base64 {len(img_b64) / 1024:.0f} KB) in {elapsed:.0f} ms"
+    )
+    with _encoded_images_lock:
+        _encoded_images[key] = data_url
+        while len(_encoded_images) > _MAX_ENCODED_IMAGES:
+            _encoded_images.popitem(last=False)
+    return data_url
+
+
+def _build_payload(use_chat_completions, model, system_prompt, input_text, max_output_tokens, thinking, image_url=None):
+    content_items = []
+    if image_url is not None:
+        content_items.append(
+            {
+                "type": "input_image",
+                "image_url": image_url,
+            }
+        )
+    content_items.append(
+        {
+            "type": "input_text",
+            "text": input_text,
+        }
+    )
+
+    if use_chat_completions:
+        message_content = []
+        if image_url is not None:
+            message_content.append(
+                {
+                    "type": "image_url",
+                    "image_url": {"url": image_url},
+                }
+            )
+        message_content.append({"type": "text", "text": input_text})
+        thinking_mode = "enabled" if thinking else "disabled"
+        return {
+            "model": model,
+            "max_tokens": max_output_tokens,
+            "thinking": {"type": thinking_mode},
+            "messages": [
+                {
+                    "role": "system",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": system_prompt,
+                        }
+                    ],
+                },
+                {
+                    "role": "user",
+                    "content": message_content,
+                },
+            ],
+        }
+
+    input_messages = []
+    if system_prompt.strip():
+        input_messages.append(
+            {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "input_text",
+                        "text": system_prompt,
+                    }
+                ],
+            }
+        )
+    input_messages.append(
+        {
+            "role": "user",
+            "content": content_items,
+        }
+    )
+
+    return {
+        "model": model,
+        "max_output_tokens": max_output_tokens,
+        "thinking": {"type": "enabled" if thinking else "disabled"},
+        "input": input_messages,
+    }
+
+
+def _request_text(resolved_url, resolved_key, payload, timeout_seconds=180, max_retries=None):
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {resolved_key}",
+    }
+    res = http_session.post(
+        resolved_url, json=payload, headers=headers, timeout=timeout_seconds, max_retries=max_retries
+    )
+    try:
+        res.raise_for_status()
+    except requests.HTTPError as exc:
+        detail = res.text.strip()
+        raise ValueError(f"HTTP {res.status_code} error: {detail}") from exc
+    data = res.json()
+    return _extract_text(data)
+
+
+def _cached_request_text(resolved_url, resolved_key, payload, timeout_seconds=180, max_retries=None, use_cache=False,
+                         limiter=None):
+    """
+    带响应缓存的 _request_text；键为接口地址与请求内容（不含 API key）的哈希。
+    limiter 只在真正发出请求前等待，命中缓存不占用速率配额。
+    """
+    cache = get_response_cache() if use_cache else None
+    if cache is not None:
+        key = cache_key("ark_chat", {"url": resolved_url, "payload": payload})
+        text = cache.get_text(key)
+        cache.record("ark_chat", text is not None)
+        if text is not None:
+            print(f"[ArkChatText] cache hit ({cache.stats('ark_chat')})")
+            return text
+
+    if limiter is not None:
+        limiter.wait()
+    text = _request_text(resolved_url, resolved_key, payload, timeout_seconds, max_retries)
+    if cache is not None:
+        cache.put_text(key, text)
+        print(f"[ArkChatText] cache miss ({cache.stats('ark_chat')})")
+    return text
+
+
 class ArkChatText:
     @classmethod
     def INPUT_TYPES(s):
@@ -59,6 +252,13 @@ class ArkChatText:
             },
             "optional": {
                 "image": ("IMAGE",),
+                # 上传前把图片最长边缩放到不超过该值（0 为不缩放）
+                "max_image_edge": ("INT", {"default": 2048, "min": 0, "max": 16384}),
+                "image_format": (IMAGE_FORMATS, {"default": "jpeg"}),
+                "timeout_seconds": ("INT", {"default": 180, "min": 1, "max": 3600}),
+                "max_retries": ("INT", {"default": http_session.MAX_RETRIES, "min": 0, "max": 10}),
+                # 相同请求直接返回缓存的结果；关闭即绕过缓存
+                "use_cache": ("BOOLEAN", {"default": True}),
             },
         }
 
@@ -67,117 +267,116 @@ class ArkChatText:
     FUNCTION = "run"
     CATEGORY = "ZKZ/API"
 
-    def run(self, input_text, system_prompt, model, max_output_tokens, thinking, api_key, api_url, image=None):
-        resolved_key = api_key.strip() or os.environ.get("ARK_API_KEY", "").strip()
-        if not resolved_key:
-            raise ValueError("Missing API key. Set api_key or ARK_API_KEY.")
+    def run(self, input_text, system_prompt, model, max_output_tokens, thinking, api_key, api_url, image=None, max_image_edge=2048, image_format="jpeg", timeout_seconds=180, max_retries=None, use_cache=True):
+        resolved_key, resolved_url, use_chat_completions = _resolve_endpoint(api_key, api_url, model)
 
-        resolved_url = api_url.strip() or os.environ.get("ARK_API_URL", "").strip() or ARK_CHAT_DEFAULT_URL
-        use_chat_completions = _use_chat_completions(resolved_url, model)
-        if not api_url.strip() and use_chat_completions:
-            resolved_url = ARK_CHAT_COMPLETIONS_URL
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {resolved_key}",
-        }
-        content_items = []
+        image_url = None
         if image is not None:
             if len(image.shape) > 3:
                 image = image[0]
-            img_np = (255.0 * image.cpu().numpy()).clip(0, 255).astype(np.uint8)
-            pil_img = Image.fromarray(img_np)
-            buffer = io.BytesIO()
-            pil_img.save(buffer, format="JPEG", quality=90)
-            img_b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-            content_items.append(
-                {
-                    "type": "input_image",
-                    "image_url": f"data:image/jpeg;base64,{img_b64}",
-                }
-            )
-        content_items.append(
-            {
-                "type": "input_text",
-                "text": input_text,
-            }
+            image_url = _encode_image_data_url(image, max_image_edge, image_format)
+
+        payload = _build_payload(
+            use_chat_completions, model, system_prompt, input_text, max_output_tokens, thinking, image_url
         )
+        text = _cached_request_text(resolved_url, resolved_key, payload, timeout_seconds, max_retries, use_cache)
 
-        if use_chat_completions:
-            message_content = []
-            if image is not None:
-                message_content.append(
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": content_items[0]["image_url"]},
-                    }
-                )
-            message_content.append({"type": "text", "text": input_text})
-            thinking_mode = "enabled" if thinking else "disabled"
-            payload = {
-                "model": model,
-                "max_tokens": max_output_tokens,
-                "thinking": {"type": thinking_mode},
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": system_prompt,
-                            }
-                        ],
-                    },
-                    {
-                        "role": "user",
-                        "content": message_content,
-                    },
-                ],
-            }
+        return (text,)
+
+
+class ArkChatTextBatch:
+    """
+    批量调用 LLM：每张图片或每行提示词发一个请求，由有界线程池并发执行，结果按输入顺序以列表输出。
+
+    图片与提示词的条数可以都大于 1（此时必须相等、逐一配对），或其中一方只有 1 条（广播到每个请求）。
+    单个请求失败不影响其它请求：失败项的 text 为空，错误信息写到同位置的 errors 中。
+    requests_per_minute 大于 0 时限制发出请求的速率。
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "system_prompt": ("STRING", {"multiline": True, "default": "你是人工智能助手"}),
+                "input_text": ("STRING", {"multiline": True, "default": ""}),
+                "model": ("STRING", {"multiline": False, "default": "doubao-seed-1-8-251228"}),
+                "max_output_tokens": ("INT", {"default": 1024, "min": 1}),
+                "thinking": ("BOOLEAN", {"default": True}),
+                "api_key": ("STRING", {"multiline": False, "default": ""}),
+                "api_url": ("STRING", {"multiline": False, "default": ""}),
+            },
+            "optional": {
+                "image": ("IMAGE",),
+                "max_image_edge": ("INT", {"default": 2048, "min": 0, "max": 16384}),
+                "image_format": (IMAGE_FORMATS, {"default": "jpeg"}),
+                # True：input_text 每个非空行作为一条提示词；False：整段作为一条
+                "split_lines": ("BOOLEAN", {"default": False}),
+                "concurrency": ("INT", {"default": 4, "min": 1, "max": 64}),
+                "requests_per_minute": ("INT", {"default": 0, "min": 0, "max": 100000}),
+                "timeout_seconds": ("INT", {"default": 180, "min": 1, "max": 3600}),
+                "max_retries": ("INT", {"default": http_session.MAX_RETRIES, "min": 0, "max": 10}),
+                # 相同请求直接返回缓存的结果；关闭即绕过缓存
+                "use_cache": ("BOOLEAN", {"default": True}),
+            },
+        }
+
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("texts", "errors")
+    OUTPUT_IS_LIST = (True, True)
+    FUNCTION = "run"
+    CATEGORY = "ZKZ/API"
+
+    def run(self, input_text, system_prompt, model, max_output_tokens, thinking, api_key, api_url, image=None,
+            max_image_edge=2048, image_format="jpeg", split_lines=False, concurrency=4, requests_per_minute=0,
+            timeout_seconds=180, max_retries=None, use_cache=True):
+        resolved_key, resolved_url, use_chat_completions = _resolve_endpoint(api_key, api_url, model)
+
+        if split_lines:
+            prompts = [line.strip() for line in input_text.splitlines() if line.strip()]
         else:
-            input_messages = []
-            if system_prompt.strip():
-                input_messages.append(
-                    {
-                        "role": "system",
-                        "content": [
-                            {
-                                "type": "input_text",
-                                "text": system_prompt,
-                            }
-                        ],
-                    }
-                )
-            input_messages.append(
-                {
-                    "role": "user",
-                    "content": content_items,
-                }
-            )
+            prompts = [input_text]
+        image_count = 0 if image is None else image.shape[0]
 
-            payload = {
-                "model": model,
-                "max_output_tokens": max_output_tokens,
-                "thinking": {"type": "enabled" if thinking else "disabled"},
-                "input": input_messages,
-            }
+        if image_count > 1 and len(prompts) > 1 and image_count != len(prompts):
+            raise ValueError(f"{image_count} images and {len(prompts)} prompts: counts must match or one side must be 1.")
+        count = max(image_count, len(prompts))
+        if count == 0:
+            return ([], [])
 
-        res = requests.post(resolved_url, json=payload, headers=headers, timeout=180)
-        try:
-            res.raise_for_status()
-        except requests.HTTPError as exc:
-            detail = res.text.strip()
-            raise ValueError(f"HTTP {res.status_code} error: {detail}") from exc
-        data = res.json()
-        text = _extract_text(data)
+        limiter = http_session.RateLimiter(requests_per_minute)
 
-        return (text,)
+        def run_item(index):
+            try:
+                image_url = None
+                if image_count:
+                    image_url = _encode_image_data_url(image[index if image_count > 1 else 0], max_image_edge, image_format)
+                prompt = prompts[index if len(prompts) > 1 else 0]
+                payload = _build_payload(
+                    use_chat_completions, model, system_prompt, prompt, max_output_tokens, thinking, image_url
+                )
+                text = _cached_request_text(
+                    resolved_url, resolved_key, payload, timeout_seconds, max_retries, use_cache, limiter
+                )
+                return text, ""
+            except Exception as exc:
+                print(f"[ArkChatTextBatch] item {index} failed: {exc}")
+                return "", str(exc)
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, count), thread_name_prefix="zkz-ark-chat") as pool:
+            results = list(pool.map(run_item, range(count)))
+
+        failed = sum(1 for _, error in results if error)
+        stats = f" (cache {get_response_cache().stats('ark_chat')})" if use_cache else ""
+        print(f"[ArkChatTextBatch] {count - failed}/{count} requests succeeded{stats}")
+        return ([text for text, _ in results], [error for _, error in results])
 
 
 NODE_CLASS_MAPPINGS = {
     "ArkChatText": ArkChatText,
+    "ArkChatTextBatch": ArkChatTextBatch,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "ArkChatText": "火山引擎 LLM",
+    "ArkChatTextBatch": "火山引擎 LLM 批量",
 }
@@ -0,0 +1,104 @@
+from .ark_chat_node import ArkChatText, _resolve_endpoint
+from .seedream_ark_node import Seedream45Generate
+from . import ark_jobs
+
+
+def _run_chat(kwargs):
+    return ArkChatText().run(**kwargs)[0]
+
+
+def _run_seedream(kwargs):
+    return Seedream45Generate().run(**kwargs)[0]
+
+
+class ArkChatTextSubmit:
+    """
+    与 ArkChatText 输入相同，但只提交请求并立即返回任务句柄；结果由 ArkCollectText 取回。
+    提交与收取之间的节点（包括本地 GPU 计算）可与远端调用同时进行。
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return ArkChatText.INPUT_TYPES()
+
+    RETURN_TYPES = ("ARK_JOB",)
+    RETURN_NAMES = ("job",)
+    FUNCTION = "submit"
+    CATEGORY = "ZKZ/API"
+
+    def submit(self, **kwargs):
+        # 缺少 API key 等配置错误在提交时就报出，而不是等到收取时
+        _resolve_endpoint(kwargs["api_key"], kwargs["api_url"], kwargs["model"])
+        label = f"chat:{kwargs['model']}:{kwargs['input_text'][:24]!r}"
+        return (ark_jobs.submit("text", _run_chat, kwargs, label=label),)
+
+
+class Seedream45Submit:
+    """与 Seedream45Generate 输入相同，但只提交生成请求并立即返回任务句柄；图片由 ArkCollectImage 取回。"""
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return Seedream45Generate.INPUT_TYPES()
+
+    RETURN_TYPES = ("ARK_JOB",)
+    RETURN_NAMES = ("job",)
+    FUNCTION = "submit"
+    CATEGORY = "ZKZ/API"
+
+    def submit(self, **kwargs):
+        label = f"seedream:{kwargs['aspect_ratio']}:{kwargs['prompt'][:24]!r}"
+        return (ark_jobs.submit("image", _run_seedream, kwargs, label=label),)
+
+
+class ArkCollectText:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "job": ("ARK_JOB",),
+                # 0 表示一直等待
+                "timeout_seconds": ("INT", {"default": 600, "min": 0, "max": 86400}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("text",)
+    FUNCTION = "collect"
+    CATEGORY = "ZKZ/API"
+
+    def collect(self, job, timeout_seconds=600):
+        return (ark_jobs.collect(job, "text", timeout_seconds or None),)
+
+
+class ArkCollectImage:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "job": ("ARK_JOB",),
+                "timeout_seconds": ("INT", {"default": 600, "min": 0, "max": 86400}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    RETURN_NAMES = ("images",)
+    FUNCTION = "collect"
+    CATEGORY = "ZKZ/API"
+
+    def collect(self, job, timeout_seconds=600):
+        return (ark_jobs.collect(job, "image", timeout_seconds or None),)
+
+
+NODE_CLASS_MAPPINGS = {
+    "ArkChatTextSubmit": ArkChatTextSubmit,
+    "Seedream45Submit": Seedream45Submit,
+    "ArkCollectText": ArkCollectText,
+    "ArkCollectImage": ArkCollectImage,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "ArkChatTextSubmit": "火山引擎 LLM（提交）",
+    "Seedream45Submit": "火山引擎 图像生成（提交）",
+    "ArkCollectText": "火山引擎 收取文本",
+    "ArkCollectImage": "火山引擎 收取图像",
+}
@@ -0,0 +1,106 @@
+"""
+API 调用的后台任务：提交节点立即返回任务句柄，调用在后台 asyncio 事件循环中执行，收取节点再取结果。
+
+事件循环运行在独立的守护线程里。HTTP 层基于 requests（同步），每个任务通过 run_in_executor
+交给有界线程池执行，事件循环只负责调度与完成通知，因此执行线程在提交后即可继续运行图中的其它节点。
+
+任务在被收取（成功返回或抛出异常）后立即移除，不在内存中保留结果（一张 2048² 图像约 50 MB）；
+收取节点的输出本身由 ComfyUI 缓存。等待超时不移除，可以再次收取。
+一直没有被收取的已完成任务最多保留 _MAX_JOBS 个，超出时丢弃最早提交的。
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+_MAX_JOBS = 32
+_JOB_WORKERS = int(os.environ.get("ZKZ_ARK_JOB_WORKERS", "8"))
+
+_loop = None
+_executor = None
+_loop_lock = threading.Lock()
+_jobs = OrderedDict()  # job_id -> concurrent.futures.Future
+_jobs_lock = threading.Lock()
+
+
+class ArkJobHandle:
+    """在节点之间传递的任务句柄（ComfyUI 类型 ARK_JOB）。"""
+
+    def __init__(self, job_id, kind, label=""):
+        self.job_id = job_id
+        self.kind = kind
+        self.label = label
+
+    def __repr__(self):
+        return f"ArkJobHandle({self.kind}, {self.label or self.job_id})"
+
+
+def _get_loop():
+    global _loop, _executor
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            _executor = ThreadPoolExecutor(max_workers=_JOB_WORKERS, thread_name_prefix="zkz-ark-job")
+            loop.set_default_executor(_executor)
+            threading.Thread(target=loop.run_forever, name="zkz-ark-jobs", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def submit(kind, fn, *args, label="", **kwargs):
+    """在后台执行 fn(*args, **kwargs)，立即返回 ArkJobHandle。"""
+    loop = _get_loop()
+    job_id = uuid.uuid4().hex
+    started = time.monotonic()
+
+    async def run():
+        return await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+    future = asyncio.run_coroutine_threadsafe(run(), loop)
+
+    def report(done):
+        elapsed = time.monotonic() - started
+        error = done.exception()
+        status = f"failed: {error}" if error is not None else "done"
+        print(f"[ArkJobs] {kind} job {label or job_id} {status} in {elapsed:.1f}s")
+
+    future.add_done_callback(report)
+    with _jobs_lock:
+        _jobs[job_id] = future
+        # 只淘汰已完成但没人收取的结果，仍在运行的任务不丢弃
+        stale = [jid for jid, f in _jobs.items() if f.done()]
+        for jid in stale[:max(0, len(_jobs) - _MAX_JOBS)]:
+            del _jobs[jid]
+    return ArkJobHandle(job_id, kind, label)
+
+
+def collect(handle, kind, timeout=None):
+    """等待任务完成并返回结果；任务失败时抛出原异常，超时抛出 TimeoutError。"""
+    if not isinstance(handle, ArkJobHandle):
+        raise ValueError(f"Expected an ARK_JOB handle, got {type(handle).__name__}")
+    if handle.kind != kind:
+        raise ValueError(f"Job {handle.label or handle.job_id} is a {handle.kind} job, not {kind}")
+    with _jobs_lock:
+        future = _jobs.get(handle.job_id)
+    if future is None:
+        raise ValueError(
+            f"Job {handle.label or handle.job_id} is unknown, expired or already collected; re-run the submit node."
+        )
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise TimeoutError(f"Job {handle.label or handle.job_id} did not finish within {timeout}s") from None
+    finally:
+        # 返回或抛出后即释放结果；超时时任务仍在运行，保留以便再次收取
+        if future.done():
+            _discard(handle.job_id)
+
+
+def _discard(job_id):
+    with _jobs_lock:
+        _jobs.pop(job_id, None)
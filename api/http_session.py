@@ -0,0 +1,159 @@
+"""
+API 节点共用的 HTTP 层。
+
+- 进程内共享一个 requests.Session，连接池保持长连接，重复请求不再每次做 DNS 解析和 TLS 握手；
+- 429 / 5xx 与连接失败按指数退避（带抖动）重试，响应带 Retry-After 时按服务端给出的时间等待；
+  POST 等非幂等请求只在确定服务端没有处理时重发（连接未建立、429、503），避免重复生成和计费；
+- 每个主机一个信号量限制并发请求数，批量调用时不会一次打满服务端的限流；
+- 超时分为连接超时和读取超时，可通过参数或环境变量配置。
+
+环境变量：ZKZ_HTTP_CONNECT_TIMEOUT（默认 10 秒）、ZKZ_HTTP_MAX_RETRIES（默认 3）、
+ZKZ_HTTP_HOST_CONCURRENCY（默认 8）、ZKZ_HTTP_BACKOFF（首次重试等待，默认 1 秒）。
+"""
+
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# 非幂等请求只重试这两个状态码：服务端明确表示没有处理该请求。502/504 时上游往往已经处理过
+NON_IDEMPOTENT_RETRY_STATUS_CODES = frozenset({429, 503})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+CONNECT_TIMEOUT = float(os.environ.get("ZKZ_HTTP_CONNECT_TIMEOUT", "10"))
+MAX_RETRIES = int(os.environ.get("ZKZ_HTTP_MAX_RETRIES", "3"))
+HOST_CONCURRENCY = int(os.environ.get("ZKZ_HTTP_HOST_CONCURRENCY", "8"))
+BACKOFF_SECONDS = float(os.environ.get("ZKZ_HTTP_BACKOFF", "1"))
+MAX_BACKOFF_SECONDS = 60.0
+
+_session = None
+_session_lock = threading.Lock()
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(HOST_CONCURRENCY, 10))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _host_semaphore(url):
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        slots = _host_slots.get(host)
+        if slots is None:
+            slots = _host_slots[host] = threading.BoundedSemaphore(max(1, HOST_CONCURRENCY))
+        return slots
+
+
+def retry_after_seconds(response):
+    """解析 Retry-After（秒数或 HTTP 日期）；没有或无法解析时返回 None。"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _request_not_sent(error):
+    """连接阶段的失败（连接超时、拒绝连接、DNS 解析失败）：请求还没有发出，重发是安全的。"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def request(method, url, timeout=180, max_retries=None, **kwargs):
+    """
+    通过共享会话发送请求，返回 requests.Response（不调用 raise_for_status）。
+
+    timeout 为读取超时（秒），也可直接传 (连接超时, 读取超时)。
+    重试用尽后返回最后一次的响应；连接错误重试用尽后抛出原异常。
+    POST 等非幂等请求可能已被服务端处理（已生成、已计费），只重试请求未发出的连接失败和 429/503；
+    读取超时、发出后连接中断、502/504 都直接返回或抛出，不再重发。
+    """
+    if not isinstance(timeout, tuple):
+        timeout = (min(CONNECT_TIMEOUT, timeout), timeout)
+    if max_retries is None:
+        max_retries = MAX_RETRIES
+    method = method.upper()
+    idempotent = method in IDEMPOTENT_METHODS
+    retry_status_codes = RETRY_STATUS_CODES if idempotent else NON_IDEMPOTENT_RETRY_STATUS_CODES
+    session = get_session()
+    slots = _host_semaphore(url)
+
+    attempt = 0
+    while True:
+        response = None
+        error = None
+        with slots:
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if not idempotent and not _request_not_sent(exc):
+                    raise
+                error = exc
+
+        if response is not None and response.status_code not in retry_status_codes:
+            return response
+        if attempt >= max_retries:
+            if response is not None:
+                return response
+            raise error
+
+        delay = retry_after_seconds(response) if response is not None else None
+        if delay is None:
+            delay = BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.8, 1.2)
+        delay = min(delay, MAX_BACKOFF_SECONDS)
+        reason = f"HTTP {response.status_code}" if response is not None else type(error).__name__
+        print(f"[ZKZ HTTP] {method} {urlsplit(url).netloc}: {reason}, retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+class RateLimiter:
+    """按固定间隔放行请求（requests_per_minute 为 0 时不限速），多个线程共享。"""
+
+    def __init__(self, requests_per_minute=0):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next_time)
+            self._next_time = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
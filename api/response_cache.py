@@ -0,0 +1,181 @@
+"""
+API 响应的磁盘缓存，按请求内容寻址。
+
+键为规范化请求（JSON 排序键）的 sha256；请求中内嵌的 data URL 图片先替换成其字节的 sha256，
+因此同一张图片重新编码得到相同字节时命中同一条缓存，键的计算也不需要序列化整段 base64。
+
+每条缓存是 api_cache/<键前两位>/<键> 下的一个文件：
+- mtime 记录写入时间，超过 TTL 视为过期；
+- atime 记录最近一次命中（命中时显式更新），总大小超过上限时按 atime 从旧到新淘汰（LRU）。
+
+命中/未命中次数不在 get 中统计：一次逻辑请求（一次对话调用、一次图像生成）可能读取多个条目，
+由调用方按用途（namespace）调用 record 各记一次，stats 只报告该用途的次数。
+
+环境变量：ZKZ_API_CACHE_DIR（缓存目录）、ZKZ_API_CACHE_TTL（秒，默认 7 天）、
+ZKZ_API_CACHE_MAX_MB（默认 1024）。
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from ..basic.file_utils import atomic_write
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DEFAULT_CACHE_DIR = os.environ.get("ZKZ_API_CACHE_DIR", "") or os.path.join(_BASE_DIR, "api_cache")
+DEFAULT_TTL_SECONDS = float(os.environ.get("ZKZ_API_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("ZKZ_API_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, str) and value.startswith("data:") and ";base64," in value:
+        return "sha256:" + hashlib.sha256(value.encode("utf-8")).hexdigest()
+    return value
+
+
+def cache_key(namespace, payload):
+    """请求的内容地址：namespace 区分用途（如 chat、seedream），payload 为可 JSON 序列化的请求内容。"""
+    normalized = json.dumps(
+        {"namespace": namespace, "payload": _normalize(payload)},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._counts = {}  # namespace -> [命中次数, 未命中次数]
+        self._lock = threading.Lock()
+        self._total_bytes = None  # 首次写入时扫描一次目录，之后增量维护
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """返回缓存的字节；不存在或已过期时返回 None。"""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.ttl_seconds:
+                self._remove(path, stat.st_size)
+                data = None
+            else:
+                with open(path, "rb") as f:
+                    data = f.read()
+                # 只更新 atime 作为 LRU 时间，mtime 保持为写入时间
+                os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            data = None
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                previous_size = os.stat(path).st_size
+            except OSError:
+                previous_size = 0
+            with atomic_write(path) as f:
+                f.write(data)
+        except OSError as e:
+            print(f"[ZKZ Cache] Failed to write '{path}': {e}")
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def touch(self, key):
+        """条目经服务端确认仍然有效时调用：写入时间和最近使用时间都更新为现在，TTL 重新计算。"""
+        try:
+            os.utime(self._path(key), None)
+        except OSError:
+            pass
+
+    def get_text(self, key):
+        data = self.get(key)
+        return None if data is None else data.decode("utf-8")
+
+    def put_text(self, key, text):
+        self.put(key, text.encode("utf-8"))
+
+    def record(self, namespace, hit):
+        """记录一次逻辑请求是否命中缓存。"""
+        with self._lock:
+            counts = self._counts.setdefault(namespace, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def stats(self, namespace):
+        with self._lock:
+            hits, misses = self._counts.get(namespace, (0, 0))
+        return f"hits={hits} misses={misses}"
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _remove(self, path, size):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _evict(self):
+        # 调用时已持有 _lock；淘汰到上限的 90%，避免每次写入都触发整目录扫描
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -1,11 +1,16 @@
 import base64
+import hashlib
 import io
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
 import torch
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageFile
+
+from . import http_session
+from .response_cache import cache_key, get_response_cache
 
 
 ARK_DEFAULT_URL = "https://ark.cn-beijing.volces.com/api/v3/images/generations"
@@ -19,6 +24,9 @@ ASPECT_RATIO_TO_SIZE = {
     "2:3": "1664x2496",
     "21:9": "3024x1296",
 }
+# 同时下载/解码的图片数
+_DOWNLOAD_WORKERS = 4
+_DOWNLOAD_CHUNK_BYTES = 256 * 1024
 
 
 def _pil_to_tensor(pil_img):
@@ -26,10 +34,95 @@ def _pil_to_tensor(pil_img):
     return torch.from_numpy(img_np)
 
 
-def _load_image_from_url(url):
-    res = requests.get(url, timeout=120)
-    res.raise_for_status()
-    return Image.open(io.BytesIO(res.content)).convert("RGB")
+def _decode_image(blob):
+    return Image.open(io.BytesIO(blob)).convert("RGB")
+
+
+def _stream_image(url, cache=None):
+    """
+    流式下载生成结果图片，边接收边交给 PIL 增量解码，返回 (RGB 图像, 原始字节)。
+    传入 cache 时按 URL 缓存下载到的字节；不缓存时不保留原始字节（返回 None）。
+    """
+    key = cache_key("seedream_download", url) if cache is not None else None
+    if key is not None:
+        blob = cache.get(key)
+        if blob is not None:
+            return _decode_image(blob), blob
+
+    res = http_session.get(url, timeout=120, stream=True)
+    try:
+        res.raise_for_status()
+        parser = ImageFile.Parser()
+        chunks = [] if key is not None else None
+        for chunk in res.iter_content(chunk_size=_DOWNLOAD_CHUNK_BYTES):
+            parser.feed(chunk)
+            if chunks is not None:
+                chunks.append(chunk)
+        image = parser.close()
+    finally:
+        res.close()
+
+    blob = None
+    if chunks is not None:
+        blob = b"".join(chunks)
+        cache.put(key, blob)
+    return image.convert("RGB"), blob
+
+
+def _load_images(sources, expected_size, cache=None):
+    """
+    并行获取并解码全部图片，直接写入预先分配的 [B, H, W, 3] 输出张量，返回 (张量, 原始字节列表)。
+
+    sources 中每项为 ("blob", 字节)、("b64", base64 字符串) 或 ("url", 地址)；
+    base64 在各自的工作线程里才解码。图片尺寸与请求的 size 不一致时退回逐张转换后再拼接。
+    """
+    width, height = expected_size
+    out = torch.empty((len(sources), height, width, 3), dtype=torch.float32)
+
+    def load(index):
+        kind, value = sources[index]
+        if kind == "url":
+            image, blob = _stream_image(value, cache)
+        else:
+            blob = value if kind == "blob" else base64.b64decode(value)
+            image = _decode_image(blob)
+        if image.size != (width, height):
+            return _pil_to_tensor(image), blob
+        out[index].copy_(torch.from_numpy(np.array(image))).div_(255.0)
+        return None, blob
+
+    with ThreadPoolExecutor(max_workers=min(_DOWNLOAD_WORKERS, len(sources)), thread_name_prefix="zkz-seedream") as pool:
+        results = list(pool.map(load, range(len(sources))))
+
+    if any(tensor is not None for tensor, _ in results):
+        images = torch.stack([tensor if tensor is not None else out[i] for i, (tensor, _) in enumerate(results)])
+    else:
+        images = out
+    return images, [blob for _, blob in results]
+
+
+def _load_cached_generation(cache, key):
+    """读取缓存的生成结果（图片字节列表）；记录或任一图片缺失时返回 None。"""
+    manifest = cache.get_text(key)
+    if manifest is None:
+        return None
+    blobs = []
+    for blob_key in json.loads(manifest):
+        data = cache.get(blob_key)
+        if data is None:
+            return None
+        blobs.append(data)
+    return blobs
+
+
+def _store_generation(cache, key, blobs):
+    """图片按内容哈希单独存放，生成记录只保存图片的键列表。"""
+    blob_keys = []
+    for data in blobs:
+        blob_key = hashlib.sha256(data).hexdigest()
+        cache.put(blob_key, data)
+        blob_keys.append(blob_key)
+    cache.put_text(key, json.dumps(blob_keys))
 
 
 class Seedream45Generate:
@@ -43,7 +136,13 @@ class Seedream45Generate:
                 "api_key": ("STRING", {"multiline": False, "default": ""}),
                 "api_url": ("STRING", {"multiline": False, "default": ""}),
                 "watermark": ("BOOLEAN", {"default": False}),
-            }
+            },
+            "optional": {
+                "timeout_seconds": ("INT", {"default": 180, "min": 1, "max": 3600}),
+                "max_retries": ("INT", {"default": http_session.MAX_RETRIES, "min": 0, "max": 10}),
+                # 开启后相同请求直接返回上次生成的图片，下载的图片也按 URL 缓存
+                "use_cache": ("BOOLEAN", {"default": False}),
+            },
         }
 
     RETURN_TYPES = ("IMAGE",)
@@ -51,7 +150,7 @@ class Seedream45Generate:
     FUNCTION = "run"
     CATEGORY = "ZKZ/API"
 
-    def run(self, prompt, aspect_ratio, model, api_key, api_url, watermark):
+    def run(self, prompt, aspect_ratio, model, api_key, api_url, watermark, timeout_seconds=180, max_retries=None, use_cache=False):
         resolved_key = api_key.strip() or os.environ.get("ARK_API_KEY", "").strip()
         if not resolved_key:
             raise ValueError("Missing API key. Set api_key or ARK_API_KEY.")
@@ -72,27 +171,43 @@ class Seedream45Generate:
             "watermark": watermark,
         }
 
-        res = requests.post(resolved_url, json=payload, headers=headers, timeout=180)
+        expected_size = tuple(int(v) for v in size.split("x"))
+        cache = get_response_cache() if use_cache else None
+        if cache is not None:
+            generation_key = cache_key("seedream", {"url": resolved_url, "payload": payload})
+            blobs = _load_cached_generation(cache, generation_key)
+            # 一次生成只记一次，不计生成记录内各图片和按 URL 缓存的下载
+            cache.record("seedream", blobs is not None)
+            if blobs is not None:
+                print(f"[Seedream45Generate] cache hit ({cache.stats('seedream')})")
+                images, _ = _load_images([("blob", blob) for blob in blobs], expected_size)
+                return (images,)
+
+        res = http_session.post(
+            resolved_url, json=payload, headers=headers, timeout=timeout_seconds, max_retries=max_retries
+        )
         res.raise_for_status()
         data = res.json()
 
         if "data" not in data or not data["data"]:
             raise ValueError(f"Unexpected response: {data}")
 
-        images = []
+        sources = []
         for item in data["data"]:
             if "b64_json" in item and item["b64_json"]:
-                img_bytes = base64.b64decode(item["b64_json"])
-                pil_img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-                images.append(_pil_to_tensor(pil_img))
+                sources.append(("b64", item["b64_json"]))
             elif "url" in item and item["url"]:
-                pil_img = _load_image_from_url(item["url"])
-                images.append(_pil_to_tensor(pil_img))
+                sources.append(("url", item["url"]))
 
-        if not images:
+        if not sources:
             raise ValueError(f"No images returned: {data}")
 
-        return (torch.stack(images),)
+        images, blobs = _load_images(sources, expected_size, cache)
+        if cache is not None:
+            _store_generation(cache, generation_key, blobs)
+            print(f"[Seedream45Generate] cache miss ({cache.stats('seedream')})")
+
+        return (images,)
 
 
 NODE_CLASS_MAPPINGS = {
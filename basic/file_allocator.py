@@ -0,0 +1,127 @@
+"""
+保存类节点共用的文件名分配器。
+
+每个 (目录, 命名序列) 只在第一次使用时确定起始编号，之后在内存中递增，不再每次扫描目录或逐个 exists() 探测：
+- 探测式命名（name、name_0001、name_0002 ...）用倍增 + 二分查找第一个空位，只需 O(log n) 次 stat；
+- 纯数字命名（0000、0001 ...）沿用“已有最大编号 + 1”的规则，只 listdir 一次。
+
+分配时用 O_CREAT | O_EXCL 独占创建一个隐藏的认领文件（.<文件名>.claim），多个进程同时保存到同一目录
+也不会拿到同一个文件名；其它进程先占用了缓存中的编号时顺延到下一个。目标路径本身在写入完成、
+原子替换之前不存在，读者（包括热文件夹批量加载）不会看到空文件或写了一半的文件。
+调用方写完（无论成功与否）后调用 release_claim 删除认领文件。
+
+上一次分配的文件已不存在（例如目录被清空）时重新计算起始编号，删除的文件名可以再次使用。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+# 缓存的命名序列数上限；文件名带时间等每次都不同的序列会不断产生新键，超出后淘汰最久未用的
+_MAX_SEQUENCES = 1024
+
+
+def first_free_index(directory, name_for):
+    """
+    找到 name_for(n) 在目录中不存在的编号：先倍增确定区间，再二分。
+    已有文件编号连续时与逐个探测的结果相同；中间有空缺时可能跳过空缺，但保证不会覆盖已有文件。
+    """
+    def exists(n):
+        return _taken(os.path.join(directory, name_for(n)))
+
+    if not exists(0):
+        return 0
+    low, high = 0, 1
+    while exists(high):
+        low, high = high, high * 2
+    while high - low > 1:
+        middle = (low + high) // 2
+        if exists(middle):
+            low = middle
+        else:
+            high = middle
+    return high
+
+
+def claim_path(path):
+    """path 对应的认领文件：同目录下的隐藏文件，扩展名不是图片，不会被扫描目录的节点读到。"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.claim")
+
+
+def _taken(path):
+    return os.path.lexists(path) or os.path.lexists(claim_path(path))
+
+
+def release_claim(path):
+    """写入结束后（成功或失败）删除 allocate_path 创建的认领文件。"""
+    try:
+        os.remove(claim_path(path))
+    except OSError:
+        pass
+
+
+def next_numeric_index(directory, extension):
+    """目录中形如 <数字>.<extension> 的文件的最大编号 + 1，没有时为 0。"""
+    suffix = f".{extension.lower()}"
+    largest = -1
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.lower().endswith(suffix):
+                continue
+            stem = name.split('.')[0]
+            if stem.isdigit():
+                largest = max(largest, int(stem))
+    return largest + 1
+
+
+class FileAllocator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = OrderedDict()  # (目录绝对路径, 序列键) -> (下一个候选编号, 上一次分配的路径)，按最近使用排序
+
+    def allocate(self, directory, name_for, key, seed=None):
+        """
+        分配 name_for(n) 中下一个可用的文件名，独占创建其认领文件后返回完整路径（目标文件本身尚不存在）。
+
+        key 区分同一目录下的不同命名序列（应包含决定文件名的全部参数）；
+        seed 为首次使用该序列时计算起始编号的函数，默认用 first_free_index。
+        """
+        directory = os.path.abspath(directory)
+        cache_key = (directory, key)
+        with self._lock:
+            cached = self._next.get(cache_key)
+            # 上一次分配的文件已被删除（且没有正在进行的写入）时重新计算，让删除的文件名可以再次使用
+            if cached is None or not _taken(cached[1]):
+                index = seed() if seed is not None else first_free_index(directory, name_for)
+            else:
+                index = cached[0]
+            while True:
+                path = os.path.join(directory, name_for(index))
+                if os.path.lexists(path):
+                    index += 1
+                    continue
+                try:
+                    fd = os.open(claim_path(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+                except FileExistsError:
+                    index += 1
+                    continue
+                os.close(fd)
+                if os.path.lexists(path):
+                    # 认领前另一个进程已写完并释放了这个文件名
+                    release_claim(path)
+                    index += 1
+                    continue
+                self._next[cache_key] = (index + 1, path)
+                self._next.move_to_end(cache_key)
+                while len(self._next) > _MAX_SEQUENCES:
+                    self._next.popitem(last=False)
+                return path
+
+
+_allocator = FileAllocator()
+
+
+def allocate_path(directory, name_for, key, seed=None):
+    return _allocator.allocate(directory, name_for, key, seed)
@@ -0,0 +1,51 @@
+"""
+节点之间共用的文件工具：文件名自然排序与原子写入。
+
+只依赖标准库，文本、图像、API 节点都可以直接导入，不会连带加载批量加载器或数据库模块。
+"""
+
+import os
+import re
+import functools
+import threading
+import contextlib
+
+
+def natural_sort_key(s):
+
+    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
+
+
+@functools.lru_cache(maxsize=262144)
+def _cached_natural_key(basename):
+    return tuple(natural_sort_key(basename))
+
+
+def image_sort_key(path):
+    """文件的排序键：按文件名自然排序，同名时按完整路径区分，保证顺序稳定且唯一。"""
+    return (_cached_natural_key(os.path.basename(path)), path)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="wb", encoding=None, fsync=False):
+    """
+    先写入同目录下的临时文件，成功后 os.replace 到 path，读者不会看到写了一半的文件。
+    写入出错时删除临时文件并抛出原异常；fsync 为 True 时替换前先把内容刷到磁盘。
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_text_atomic(path, text):
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        f.write(text)
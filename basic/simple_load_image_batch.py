@@ -1,16 +1,60 @@
 import os
 import glob
+import bisect
+import fnmatch
+import hashlib
 import json
 from PIL import Image, ImageOps
 import torch
 import numpy as np
 import time
-import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import folder_paths
 
-def natural_sort_key(s):
+# natural_sort_key 仍可从本模块导入，兼容原有的导入路径
+from .file_utils import natural_sort_key, image_sort_key, atomic_write
+
+
+def _is_flat_pattern(pattern):
+    return "**" not in pattern and "/" not in pattern and os.sep not in pattern
+
+
+def scan_image_files(directory_path, pattern):
+    """
+    列出目录下匹配 pattern 的图片文件（绝对路径，未排序）。
+
+    简单的单层通配符直接用 os.scandir 的结果过滤，避免 glob 的额外 stat；
+    含子目录或 ** 的模式仍交给 glob 处理。
+    """
+    if not directory_path:
+        return []
+    try:
+        if _is_flat_pattern(pattern):
+            paths = []
+            include_hidden = pattern.startswith(".")
+            with os.scandir(directory_path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name.startswith(".") and not include_hidden:
+                        continue
+                    if os.path.splitext(name)[1].lower() not in ALLOWED_EXT:
+                        continue
+                    if fnmatch.fnmatch(name, pattern) and entry.is_file():
+                        paths.append(os.path.abspath(entry.path))
+            return paths
 
-    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', s)]
+        search_path = os.path.join(glob.escape(directory_path), pattern)
+        return [
+            os.path.abspath(file_name)
+            for file_name in glob.glob(search_path, recursive=True)
+            if os.path.splitext(file_name)[1].lower() in ALLOWED_EXT
+        ]
+    except Exception as e:
+        print(f"Error while searching for files in '{directory_path}': {e}")
+        return []
 
 class ValidatePath:
     @classmethod
@@ -40,38 +84,193 @@ TEXT_TYPE = "STRING"
 
 
 class SimpleDB:
-    def __init__(self):
-        base_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-        self.db_path = os.path.join(base_dir, "batch_counter.json")
-        self.load_db()
+    """
+    持久化的游标存储（键 -> JSON 值），基于 SQLite。
 
-    def load_db(self):
-        if os.path.exists(self.db_path):
-            try:
-                with open(self.db_path, 'r', encoding='utf-8') as f:
-                    self.data = json.load(f)
-            except:
-                self.data = {}
-        else:
-            self.data = {}
+    使用 WAL 日志：每次写入都是一个原子事务，fsync 由检查点批量完成；
+    多个 ComfyUI 进程共用同一个文件时由 SQLite 的文件锁保证安全。
+    首次打开时会把旧版 batch_counter.json 中的数据导入，并将其重命名为 .migrated。
+    """
 
-    def save_db(self):
+    def __init__(self, db_path=None):
+        base_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        self.db_path = db_path or os.path.join(base_dir, "batch_counter.sqlite3")
+        self.legacy_json_path = os.path.join(os.path.dirname(self.db_path), "batch_counter.json")
+        self._lock = threading.Lock()
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with open(self.db_path, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cursors (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._migrate_legacy_json()
+
+    def _migrate_legacy_json(self):
+        if not os.path.exists(self.legacy_json_path):
+            return
+        try:
+            with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"SimpleDB: failed to read legacy '{self.legacy_json_path}', skipping migration. Error: {e}")
+            return
+        if isinstance(legacy, dict) and legacy:
+            # 已存在的键以 SQLite 中的为准，多个进程同时迁移也是幂等的
+            self._write_rows(
+                "INSERT OR IGNORE INTO cursors (key, value) VALUES (?, ?)",
+                [(str(key), json.dumps(value)) for key, value in legacy.items()],
+            )
+        try:
+            os.replace(self.legacy_json_path, self.legacy_json_path + ".migrated")
+        except OSError:
+            pass
 
     def get(self, key, default=0):
-        return self.data.get(key, default)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cursors WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
 
     def insert(self, key, value):
-        self.data[key] = value
-        self.save_db()
+        self.insert_many({key: value})
+
+    def insert_many(self, items):
+        """在一个事务里写入多个键。"""
+        self._write_rows(
+            "INSERT INTO cursors (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            [(key, json.dumps(value)) for key, value in items.items()],
+        )
+
+    def _write_rows(self, sql, rows):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(sql, rows)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+
+def collect_directory_mtimes(directory_path, pattern):
+    """
+    记录决定扫描结果的目录及其 mtime_ns。
+
+    新增/删除文件或子目录都会改变其父目录的 mtime，因此只需逐个 stat 这些目录即可判断列表是否过期。
+    """
+    mtimes = {}
+    try:
+        mtimes[directory_path] = os.stat(directory_path).st_mtime_ns
+        if not _is_flat_pattern(pattern):
+            for root, dirs, _ in os.walk(directory_path):
+                for name in dirs:
+                    sub = os.path.join(root, name)
+                    mtimes[sub] = os.stat(sub).st_mtime_ns
+    except OSError:
+        pass
+    return mtimes
+
+
+class ScanManifest:
+    """
+    目录扫描结果的磁盘缓存，按 (path, pattern) 区分。
+
+    保存排好序的文件列表与预先解析的排序键，以及相关目录的 mtime；
+    重启时只需 stat 这些目录即可确认列表仍然有效，无需重新扫描整个目录树。
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory_path, pattern, cache_dir=None):
+        base_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        self.cache_dir = cache_dir or os.path.join(base_dir, "scan_cache")
+        self.directory_path = directory_path
+        self.pattern = pattern
+        digest = hashlib.sha1(f"{os.path.abspath(directory_path)}|{pattern}".encode("utf-8")).hexdigest()
+        self.path = os.path.join(self.cache_dir, f"{digest}.json")
+
+    def load(self):
+        """返回 (sort_keys, paths, is_valid)；没有可用缓存时返回 None。"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (data.get("version") != self.VERSION
+                or data.get("directory") != os.path.abspath(self.directory_path)
+                or data.get("pattern") != self.pattern):
+            return None
+
+        paths = data["files"]
+        sort_keys = [(tuple(key), path) for key, path in zip(data["keys"], paths)]
+        is_valid = all(
+            self._mtime_ns(directory) == mtime for directory, mtime in data["dirs"].items()
+        )
+        return sort_keys, paths, is_valid
+
+    def save(self, sort_keys, paths, dir_mtimes):
+        data = {
+            "version": self.VERSION,
+            "directory": os.path.abspath(self.directory_path),
+            "pattern": self.pattern,
+            "dirs": dir_mtimes,
+            "files": paths,
+            "keys": [key[0] for key in sort_keys],
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with atomic_write(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"Failed to write scan manifest '{self.path}': {e}")
+
+    @staticmethod
+    def _mtime_ns(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
 
 
 def pil2tensor(image):
     return torch.from_numpy(np.array(image).astype(np.float32) / 255.0).unsqueeze(0)
 
 
+_PREFETCH_WORKERS = 4
+_prefetch_pool = None
+_prefetch_pool_lock = threading.Lock()
+
+
+def _get_prefetch_pool():
+    global _prefetch_pool
+    with _prefetch_pool_lock:
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS, thread_name_prefix="zkz-image-prefetch")
+        return _prefetch_pool
+
+
+def read_image_entry(image_path):
+    """打开、按 EXIF 旋转并完整解码图片，同时读取同名 .txt；供同步读取与后台预取共用。"""
+    image = Image.open(image_path)
+    image = ImageOps.exif_transpose(image)
+    image.load()
+    filename = os.path.splitext(os.path.basename(image_path))[0]
+
+    text_path = os.path.splitext(image_path)[0] + ".txt"
+    try:
+        with open(text_path, 'r', encoding='utf-8') as f:
+            text_content = f.read()
+    except FileNotFoundError:
+        text_content = ""
+    return image, filename, text_content
+
+
+def _file_mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
 class Simple_Load_Image_Batch:
     # (这个类的其他部分没有变化，所以省略了)
     def __init__(self):
@@ -92,35 +291,43 @@ class Simple_Load_Image_Batch:
                 "loop": (["true", "false"], {"default": "true"}),
                 "allow_RGBA_output": (["false", "true"], {"default": "false"}),
                 "reset": ("INT", {"default": 0, "min": 0, "max": 1, "step": 1}),
+                # 后台预解码后续 N 张图片（0 为关闭），内存中最多保留 N 张
+                "prefetch": ("INT", {"default": 0, "min": 0, "max": 1024, "step": 1}),
+                # 每次执行输出的图片数量；尺寸不一致时按 size_policy 对齐
+                "batch_size": ("INT", {"default": 1, "min": 1, "max": 1024, "step": 1}),
+                "size_policy": (["resize_to_first", "pad_to_largest"], {"default": "resize_to_first"}),
             },
         }
 
     RETURN_TYPES = ("IMAGE", "MASK", TEXT_TYPE, "STRING", "STRING")
     RETURN_NAMES = ("image", "mask", "filename_text", "text", "total_images")
+    # 文件名与文本按批次中的每张图各输出一项
+    OUTPUT_IS_LIST = (False, False, True, True, False)
     FUNCTION = "load_batch_images"
     CATEGORY = "ZKZ/Image Tools"
 
-    def load_batch_images(self, path, pattern='*', loop="true", allow_RGBA_output='false', reset=0):
+    def load_batch_images(self, path, pattern='*', loop="true", allow_RGBA_output='false', reset=0, prefetch=0,
+                          batch_size=1, size_policy="resize_to_first"):
         if not path or not os.path.exists(path):
             print(f"Load Image Batch: Path '{path}' is invalid or does not exist. Halting execution.")
-            return (None, None, None, None, None)
-
-        directory_mtime = self.get_directory_mtime(path)
+            return (None, None, [None], [None], None)
 
+        # 目录内容变化由 BatchImageLoader 增量刷新，无需重建
         recreate_loader = (
                 self.loader is None
                 or self.loader.key != f"{path}|{pattern}"
                 or self.prev_loop != loop
                 or reset != self.prev_reset
-                or self.loader.mtime != directory_mtime
                 or self.prev_allow_RGBA_output != allow_RGBA_output
                 or self.prev_path != path
                 or self.prev_pattern != pattern
         )
 
         if recreate_loader:
-            if self.loader is not None and self.prev_loop == "true" and loop == "false":
-                self.db.insert(self.loader.key + "_temp_index", self.loader.index)
+            if self.loader is not None:
+                self.loader.clear_prefetch()
+                if self.prev_loop == "true" and loop == "false":
+                    self.db.insert(self.loader.key + "_temp_index", self.loader.index)
 
             self.loader = BatchImageLoader(path, pattern, self.db)
 
@@ -138,19 +345,26 @@ class Simple_Load_Image_Batch:
         self.prev_path = path
         self.prev_pattern = pattern
 
-        image, filename, text_content = self.loader.get_next_image(loop == "true")
+        self.loader.prefetch_depth = prefetch
+        entries = self.loader.get_next_images(batch_size, loop == "true")
 
-        if image is None:
-            return (None, None, "", "", "0")
+        if not entries:
+            return (None, None, [""], [""], "0")
 
-        mask = self.generate_mask(image, allow_RGBA_output)
-
-        if allow_RGBA_output == "false" and image.mode != "RGB":
-            image = image.convert("RGB")
+        images = []
+        masks = []
+        for image, _, _ in entries:
+            masks.append(self.generate_mask(image, allow_RGBA_output))
+            if allow_RGBA_output == "false" and image.mode != "RGB":
+                image = image.convert("RGB")
+            images.append(image)
 
+        image_tensor, mask_tensor = self.assemble_batch(images, masks, size_policy)
+        filenames = [filename for _, filename, _ in entries]
+        texts = [text_content for _, _, text_content in entries]
         total_images_text = str(self.loader.get_total_images())
 
-        return (pil2tensor(image), pil2tensor(mask), filename, text_content, total_images_text)
+        return (image_tensor, mask_tensor, filenames, texts, total_images_text)
 
     # IS_CHANGED 和其他方法保持不变...
     @classmethod
@@ -179,6 +393,38 @@ class Simple_Load_Image_Batch:
         except (OSError, TypeError):
             return 0.0
 
+    @staticmethod
+    def assemble_batch(images, masks, size_policy="resize_to_first"):
+        """
+        把多张 PIL 图像与遮罩拼成 [N, H, W, C] / [N, H, W] 张量。
+
+        resize_to_first：其余图像缩放到第一张的尺寸；
+        pad_to_largest：居中补边到本批最大尺寸，补出的区域为黑色且遮罩为 0。
+        """
+        if len(images) == 1:
+            return pil2tensor(images[0]), pil2tensor(masks[0])
+
+        # 混合模式时统一到 RGBA（若有）或 RGB，保证通道数一致
+        target_mode = "RGBA" if any(image.mode == "RGBA" for image in images) else "RGB"
+        images = [image if image.mode == target_mode else image.convert(target_mode) for image in images]
+
+        if size_policy == "resize_to_first":
+            size = images[0].size
+            images = [image if image.size == size else image.resize(size, Image.LANCZOS) for image in images]
+            masks = [mask if mask.size == size else mask.resize(size, Image.LANCZOS) for mask in masks]
+            return torch.cat([pil2tensor(image) for image in images]), torch.cat([pil2tensor(mask) for mask in masks])
+
+        max_w = max(image.width for image in images)
+        max_h = max(image.height for image in images)
+        image_tensor = torch.zeros((len(images), max_h, max_w, len(target_mode)), dtype=torch.float32)
+        mask_tensor = torch.zeros((len(images), max_h, max_w), dtype=torch.float32)
+        for i, (image, mask) in enumerate(zip(images, masks)):
+            top = (max_h - image.height) // 2
+            left = (max_w - image.width) // 2
+            image_tensor[i, top:top + image.height, left:left + image.width] = pil2tensor(image)[0]
+            mask_tensor[i, top:top + image.height, left:left + image.width] = pil2tensor(mask)[0]
+        return image_tensor, mask_tensor
+
     def generate_mask(self, image, allow_RGBA_output):
         if allow_RGBA_output == "true" and image.mode == "RGBA":
             mask_np = np.array(image.split()[-1])
@@ -188,97 +434,204 @@ class Simple_Load_Image_Batch:
 
 
 class BatchImageLoader:
-    def __init__(self, directory_path, pattern, db):
+    def __init__(self, directory_path, pattern, db, prefetch_depth=0):
         self.db = db
+        self.prefetch_depth = prefetch_depth
+        # path -> (Future, 调度时的文件 mtime)，按游标顺序排列，数量不超过 prefetch_depth
+        self._prefetched = OrderedDict()
         self.directory_path = directory_path
         self.pattern = pattern
         self.key = f"{directory_path}|{pattern}"
+        # image_paths 与 _sort_keys 一一对应，始终按自然排序保持有序
         self.image_paths = []
-        self.load_images(directory_path, pattern)
-        
-        # 3. 使用新的自然排序key
-        self.image_paths.sort(key=lambda x: natural_sort_key(os.path.basename(x)))
-        
-        self.index = self.db.get(self.key, 0)
+        self._sort_keys = []
         self.end_reached = False
+        self.manifest = ScanManifest(directory_path, pattern)
+        # 先恢复游标：缓存过期时增量刷新要以上次读到的文件为锚点重新定位游标
+        self.index = self.db.get(self.key, 0)
+        cached = self.manifest.load()
+        if cached is None:
+            self.load_images(directory_path, pattern)
+        else:
+            # 有缓存时直接使用；目录已变化则以缓存为基础做一次增量刷新
+            self._sort_keys, self.image_paths, is_valid = cached
+            if not is_valid:
+                self.refresh_images()
+
         self.mtime = Simple_Load_Image_Batch.get_directory_mtime(directory_path)
 
     def load_images(self, directory_path, pattern):
-        self.image_paths = []
-        if not directory_path:
+        """完整扫描并排序（仅在没有扫描缓存时使用）。"""
+        dir_mtimes = collect_directory_mtimes(directory_path, pattern)
+        paths = scan_image_files(directory_path, pattern)
+        keyed = sorted((image_sort_key(path), path) for path in paths)
+        self._sort_keys = [key for key, _ in keyed]
+        self.image_paths = [path for _, path in keyed]
+        self._save_manifest(dir_mtimes)
+
+    def _save_manifest(self, dir_mtimes):
+        # 写缓存放到后台线程，传入列表快照，避免阻塞执行
+        _get_prefetch_pool().submit(self.manifest.save, list(self._sort_keys), list(self.image_paths), dir_mtimes)
+
+    def refresh_images(self):
+        """
+        目录变化后增量更新文件列表：只删除消失的文件、把新文件插入到有序位置，
+        并让游标停留在原先的下一张文件上，而不是回到开头。
+        """
+        dir_mtimes = collect_directory_mtimes(self.directory_path, self.pattern)
+        current = set(scan_image_files(self.directory_path, self.pattern))
+        known = set(self.image_paths)
+        added = current - known
+        removed = known - current
+        if not added and not removed:
+            self._save_manifest(dir_mtimes)
             return
-        search_path = os.path.join(glob.escape(directory_path), pattern)
-        try:
-            for file_name in glob.glob(search_path, recursive=True):
-                if os.path.splitext(file_name)[1].lower() in ALLOWED_EXT:
-                    self.image_paths.append(os.path.abspath(file_name))
-        except Exception as e:
-            print(f"Error while searching for files in '{directory_path}': {e}")
+
+        # 以最后一张已读取的文件为锚点，刷新后游标指向它之后的位置
+        anchor = None
+        if 0 < self.index <= len(self.image_paths):
+            anchor = self._sort_keys[self.index - 1]
+
+        if removed:
+            kept = [(key, path) for key, path in zip(self._sort_keys, self.image_paths) if path not in removed]
+            self._sort_keys = [key for key, _ in kept]
+            self.image_paths = [path for _, path in kept]
+
+        if len(added) <= 64:
+            for path in added:
+                key = image_sort_key(path)
+                position = bisect.bisect_left(self._sort_keys, key)
+                self._sort_keys.insert(position, key)
+                self.image_paths.insert(position, path)
+        else:
+            # 大量新增时整体归并排序，已排序部分对 Timsort 来说几乎是线性的
+            keyed = list(zip(self._sort_keys, self.image_paths))
+            keyed.extend((image_sort_key(path), path) for path in added)
+            keyed.sort()
+            self._sort_keys = [key for key, _ in keyed]
+            self.image_paths = [path for _, path in keyed]
+
+        self.index = bisect.bisect_right(self._sort_keys, anchor) if anchor is not None else 0
+        if self.index < len(self.image_paths):
+            self.end_reached = False
+        # 游标与新的文件列表一起落盘，重启时两者保持一致
+        self.db.insert(self.key, self.index)
+        self._save_manifest(dir_mtimes)
+        print(f"Directory content has changed: +{len(added)} / -{len(removed)} files, cursor at {self.index}.")
 
     def get_next_image(self, loop=True):
+        entries = self.get_next_images(1, loop)
+        if not entries:
+            return None, None, None
+        return entries[0]
+
+    def get_next_images(self, count, loop=True):
+        """
+        按顺序取出最多 count 张图片，返回 [(image, filename, text_content), ...]。
+
+        开启循环时一批最多取 len(image_paths) 张，不会在同一批里重复；
+        游标只在整批取完后写入数据库一次。
+        """
         current_mtime = Simple_Load_Image_Batch.get_directory_mtime(self.directory_path)
         if current_mtime != self.mtime:
-            print("Directory content has changed. Reloading and sorting file list.")
-            self.load_images(self.directory_path, self.pattern)
-
-            # 3. 使用新的自然排序key
-            self.image_paths.sort(key=lambda x: natural_sort_key(os.path.basename(x)))
-            
             self.mtime = current_mtime
-            self.index = 0
+            self.refresh_images()
+
+        if loop:
+            count = min(count, len(self.image_paths))
+
+        entries = []
+        while len(entries) < count:
+            entry = self._next_entry(loop)
+            if entry is None:
+                break
+            entries.append(entry)
+
+        if entries:
+            self.db.insert(self.key, self.index)
+            self._schedule_prefetch(loop)
+        return entries
 
-        # （后续的 get_next_image 逻辑保持不变）
+    def _next_entry(self, loop):
         if not self.image_paths:
-            return None, None, None
+            return None
 
         if self.index >= len(self.image_paths):
             if loop:
                 self.index = 0
             else:
                 self.end_reached = True
-                return None, None, None
+                return None
         
         if not loop and self.end_reached:
-             return None, None, None
+             return None
 
-        original_index = self.index
-        while True:
+        for _ in range(len(self.image_paths)):
             if self.index >= len(self.image_paths):
                 if loop: self.index = 0
                 else:
                     self.end_reached = True
-                    return None, None, None
+                    return None
 
             image_path = self.image_paths[self.index]
-            text_path = os.path.splitext(image_path)[0] + ".txt"
             
             try:
-                image = Image.open(image_path)
-                image = ImageOps.exif_transpose(image)
-                filename = os.path.splitext(os.path.basename(image_path))[0]
-
-                try:
-                    with open(text_path, 'r', encoding='utf-8') as f:
-                        text_content = f.read()
-                except FileNotFoundError:
-                    text_content = ""
-
-                next_index = self.index + 1
-                self.index = next_index
-                self.db.insert(self.key, self.index)
-                return image, filename, text_content
+                entry = self._take_entry(image_path)
+                self.index += 1
+                return entry
 
             except Exception as e:
                 print(f"Error loading image: {image_path}. Skipping. Error: {e}")
                 self.index += 1
-                if self.index == original_index:
-                    print("All images in the directory failed to load.")
-                    return None, None, None
-                continue
+
+        print("All images in the directory failed to load.")
+        return None
 
     def get_total_images(self):
         return len(self.image_paths)
 
+    def _take_entry(self, image_path):
+        """优先取用预取结果；文件在预取后被改写则丢弃并同步重新读取。"""
+        pending = self._prefetched.pop(image_path, None)
+        if pending is not None:
+            future, mtime_ns = pending
+            if mtime_ns is not None and _file_mtime_ns(image_path) == mtime_ns:
+                return future.result()
+            future.cancel()
+        return read_image_entry(image_path)
+
+    def _schedule_prefetch(self, loop):
+        if self.prefetch_depth <= 0 or not self.image_paths:
+            self.clear_prefetch()
+            return
+
+        total = len(self.image_paths)
+        wanted = []
+        for offset in range(min(self.prefetch_depth, total)):
+            position = self.index + offset
+            if position >= total:
+                if not loop:
+                    break
+                position %= total
+            wanted.append(self.image_paths[position])
+
+        # 游标已经越过的条目直接丢弃，保证内存中最多只有 prefetch_depth 张
+        for path in list(self._prefetched):
+            if path not in wanted:
+                self._prefetched.pop(path)[0].cancel()
+
+        pool = _get_prefetch_pool()
+        for path in wanted:
+            if path not in self._prefetched:
+                # 先记录 mtime 再提交：读取期间文件被改写时，取用时的 mtime 必然与记录不同
+                mtime_ns = _file_mtime_ns(path)
+                self._prefetched[path] = (pool.submit(read_image_entry, path), mtime_ns)
+
+    def clear_prefetch(self):
+        for future, _ in self._prefetched.values():
+            future.cancel()
+        self._prefetched.clear()
+
 NODE_CLASS_MAPPINGS = {
     "ComfyUI-ZKZNodes.Simple_Load_Image_Batch": Simple_Load_Image_Batch
 }
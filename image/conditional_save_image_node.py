@@ -1,15 +1,16 @@
 import os
-import torch
-from PIL import Image
-import numpy as np
+import re
 from datetime import datetime, date
 import folder_paths
 
+from ..basic.file_allocator import allocate_path
+from .image_writer import get_image_writer, encode_options, quantize_frames
+
 class ConditionalSaveImageNode:
     CATEGORY = "ZKZ/Image Tools"
 
-    RETURN_TYPES = ("IMAGE",)
-    RETURN_NAMES = ("image",)
+    RETURN_TYPES = ("IMAGE", "STRING")
+    RETURN_NAMES = ("image", "saved_paths")
 
     @classmethod
     def INPUT_TYPES(s):
@@ -26,88 +27,97 @@ class ConditionalSaveImageNode:
                 "use_date_folder": (["True","False"],{"default":"True"}),
                 "use_date_in_filename": (["True", "False"], {"default": "False"}),
                 "use_time_in_filename": (["True", "False"], {"default": "False"}),
+            },
+            "optional": {
+                "png_compress_level": ("INT", {"default": 6, "min": 0, "max": 9}),
+                "quality": ("INT", {"default": 0, "min": 0, "max": 100}),
+                "write_mode": (["async", "sync"], {"default": "async"}),
             }
         }
 
     FUNCTION = "execute"
 
-    def execute(self, image, condition, base_save_path, filename_prefix, filename_suffix, file_type, overwrite_if_exists, folder_suffix, use_date_folder, use_date_in_filename, use_time_in_filename):
-        if condition == "1":
-            if not base_save_path:
-                save_path = folder_paths.get_output_directory()  # Use ComfyUI's output directory if base_save_path is empty
-            else:
-                real_base_path = base_save_path
-
-
-            if(use_date_folder=="True"):
-                today = date.today()
-                folder_name = today.strftime("%Y-%m-%d")
-                if(folder_suffix!=""):
-                    folder_name=f"{folder_name}-{folder_suffix}"
-
-                save_path = os.path.join(real_base_path, folder_name)
+    @staticmethod
+    def parse_conditions(condition, batch_size):
+        """
+        把 condition 解析为逐帧的保存标记："1" 表示保存。
+        单个值作用于整批；"1,0,1"（逗号或空白分隔）按顺序对应各帧，缺少标记的帧不保存。
+        """
+        flags = [flag == "1" for flag in re.split(r"[,\s]+", str(condition).strip()) if flag]
+        if len(flags) == 1:
+            return flags * batch_size
+        if len(flags) != batch_size:
+            print(f"[ConditionalSaveImage] {len(flags)} condition flags for {batch_size} frames; frames without a flag are skipped")
+        return (flags + [False] * batch_size)[:batch_size]
+
+    def execute(self, image, condition, base_save_path, filename_prefix, filename_suffix, file_type, overwrite_if_exists, folder_suffix, use_date_folder, use_date_in_filename, use_time_in_filename, png_compress_level=6, quality=0, write_mode="async"):
+        selected = [i for i, flag in enumerate(self.parse_conditions(condition, len(image))) if flag]
+        if not selected:
+            return (image, "")
+
+        # 未指定保存路径时使用 ComfyUI 的输出目录
+        real_base_path = base_save_path or folder_paths.get_output_directory()
+
+        if(use_date_folder=="True"):
+            today = date.today()
+            folder_name = today.strftime("%Y-%m-%d")
+            if(folder_suffix!=""):
+                folder_name=f"{folder_name}-{folder_suffix}"
+
+            save_path = os.path.join(real_base_path, folder_name)
+        else:
+             save_path = real_base_path
+
+        if not os.path.isdir(save_path):
+            os.makedirs(save_path,exist_ok=True)
+
+        file_type = file_type.lower()
+
+        filename_parts = []
+
+        if filename_prefix:
+           filename_parts.append(filename_prefix)
+
+        if use_date_in_filename == "True":
+            filename_parts.append(date.today().strftime("%Y-%m-%d"))
+
+        if use_time_in_filename == "True":
+             filename_parts.append(datetime.now().strftime("%H-%M-%S"))
+
+        if filename_suffix:
+            filename_parts.append(filename_suffix)
+
+        base_filename = "_".join(filename_parts) if filename_parts else "image" # Default filename if no prefix/suffix
+
+        # 依次尝试 name、name_0001 ...（默认名 image 时为 image、0001 ...），由分配器缓存编号并独占创建
+        def name_for(n):
+            if n == 0:
+                return f"{base_filename}.{file_type}"
+            return f"{base_filename}_{n:04}.{file_type}" if base_filename != "image" else f"{n:04}.{file_type}"
+
+        # 只量化选中的帧，交给后台写入线程池并行编码
+        frames = quantize_frames(image, selected)
+        writer = get_image_writer()
+        options = encode_options(file_type, png_compress_level, quality)
+        saved_paths = []
+        futures = []
+        for k, frame_index in enumerate(selected):
+            if overwrite_if_exists == "True":
+                # 覆盖模式下第 k 张选中的帧固定写到序列中的第 k 个文件名
+                full_path = os.path.join(save_path, name_for(k))
             else:
-                 save_path = real_base_path
-
-            if not os.path.isdir(save_path):
-                os.makedirs(save_path,exist_ok=True)
-
-            file_type = file_type.lower()
-
-            filename_parts = []
-
-            if filename_prefix:
-               filename_parts.append(filename_prefix)
-
-            if use_date_in_filename == "True":
-                filename_parts.append(date.today().strftime("%Y-%m-%d"))
-
-            if use_time_in_filename == "True":
-                 filename_parts.append(datetime.now().strftime("%H-%M-%S"))
-
-            if filename_suffix:
-                filename_parts.append(filename_suffix)
-
-            base_filename = "_".join(filename_parts) if filename_parts else "image" # Default filename if no prefix/suffix
-
-            i = 1
-            while True:
-                if i > 1:
-                    filename = f"{base_filename}_{i-1:04}.{file_type}" if base_filename != "image" else f"{i-1:04}.{file_type}" # Add counter only if needed for non-overwrite
-                else:
-                    filename = f"{base_filename}.{file_type}" if base_filename != "image" else f"image.{file_type}" # No counter for the first try
-
-                full_path = os.path.join(save_path, filename)
-
-                if overwrite_if_exists=="True" or not os.path.exists(full_path):
-                    break
-
-                if overwrite_if_exists=="False":
-                    i += 1
-                else:
-                    break # If overwrite is true, we only try once and overwrite
-
-
-            img = (image * 255).clamp(0, 255).to(torch.uint8)
-            img = img.cpu().numpy()
-
-            if img.ndim==4: # Remove batch dimension
-                  img = img[0]
-
-            # Improved shape handling
-            if img.ndim == 3: # Potential RGB or other multi-channel
-                if img.shape[2] == 1:  # Grayscale image with trailing channel
-                    img = np.squeeze(img, axis=-1)  # Remove trailing channel
-                elif img.shape[0] == 1 or img.shape[1] == 1: #Handle cases like (1, H, W) or (H, 1, W)
-                    img = np.squeeze(img) #Remove the dimension of size 1 if any
-            elif img.ndim > 3:
-                raise ValueError(f"Unexpected image dimensions: {img.shape}") # Raise error if dimension is still greater than 3
-
-            img = Image.fromarray(img)
-            img.save(full_path)
-
-            print(f"Saved image to: {full_path}")
-        return (image,)
+                full_path = allocate_path(save_path, name_for, ("conditional", base_filename, file_type))
+            futures.append(writer.submit(
+                frames[k], full_path, file_type, options, f"(frame {frame_index}) ",
+                claimed=overwrite_if_exists != "True",
+            ))
+            saved_paths.append(full_path)
+
+        if write_mode == "sync":
+            for future in futures:
+                future.result()
+
+        return (image, "\n".join(saved_paths))
 
 NODE_CLASS_MAPPINGS = {
     "ConditionalSaveImageNode": ConditionalSaveImageNode,
@@ -1,6 +1,4 @@
-import torch
-from PIL import Image
-import numpy as np
+from . import kernels
 
 class CropTransparentAndResizeNode:
     @classmethod
@@ -19,36 +17,26 @@ class CropTransparentAndResizeNode:
     CATEGORY = "ZKZ/Image Tools"
 
     def crop_and_resize(self, image, max_size, margin=0, resize_mode="fit_longest"):
-        # 将输入的张量转换为PIL图像
-        image_tensor = image.clone()
-        image = image.squeeze(0).numpy()
-        image = (image * 255).astype(np.uint8)
-        pil_image = Image.fromarray(image, mode="RGBA")
+        image = kernels.ensure_rgba(image)
+        full_height, full_width = image.shape[1], image.shape[2]
 
-        if pil_image.mode != 'RGBA':
-            raise ValueError("输入图像必须包含透明度通道（RGBA模式）。")
-
-        # 裁剪透明边
-        bbox = pil_image.getbbox()
+        # 裁剪透明边（整批取并集）
+        bbox = kernels.union_bbox(kernels.alpha_bbox(image, margin))
         if bbox:
             left, upper, right, lower = bbox
-            left = max(0, left - margin)
-            upper = max(0, upper - margin)
-            right = min(pil_image.width, right + margin)
-            lower = min(pil_image.height, lower + margin)
-            cropped_image = pil_image.crop((left, upper, right, lower))
+            cropped_image = kernels.crop(image, bbox)
         else:
-            cropped_image = pil_image
+            cropped_image = image
 
         # 缩放最长边为max_size，保持比例
-        width, height = cropped_image.size
+        height, width = cropped_image.shape[1], cropped_image.shape[2]
         if width > height:
             new_width = max_size
-            new_height = int(height * (max_size / width))
+            new_height = max(1, int(height * (max_size / width)))
         else:
             new_height = max_size
-            new_width = int(width * (max_size / height))
-        resized_image = cropped_image.resize((new_width, new_height), Image.LANCZOS)
+            new_width = max(1, int(width * (max_size / height)))
+        resized_image = kernels.resize(cropped_image, new_height, new_width)
 
         if resize_mode == "fit_and_pad":
             # 自动保持原图像的对齐方式
@@ -63,26 +51,25 @@ class CropTransparentAndResizeNode:
                 # 如果原图像与裁剪框的某一边重合，则补边时也贴边
                 if left == 0:
                     paste_x = 0
-                if right == pil_image.width:
+                if right == full_width:
                     paste_x = pad_w
                 if upper == 0:
                     paste_y = 0
-                if lower == pil_image.height:
+                if lower == full_height:
                     paste_y = pad_h
-            padded = Image.new("RGBA", (max_size, max_size), (0, 0, 0, 0))
-            padded.paste(resized_image, (paste_x, paste_y))
-            final_image = padded
+            final_image = kernels.pad(
+                resized_image,
+                top=paste_y,
+                bottom=pad_h - paste_y,
+                left=paste_x,
+                right=pad_w - paste_x,
+            )
         else:
             final_image = resized_image
 
         # 提取mask
-        alpha_np = np.array(final_image.split()[-1]).astype(np.float32) / 255.0  # [H, W]
-        mask_tensor = torch.from_numpy(alpha_np).unsqueeze(0)  # [1, H, W]
-
-        # 转回tensor
-        image_np = np.array(final_image).astype(np.float32) / 255.0
-        image_tensor = torch.from_numpy(image_np).unsqueeze(0)
-        return (image_tensor, mask_tensor)
+        mask_tensor = kernels.extract_alpha(final_image)
+        return (final_image, mask_tensor)
 
 NODE_CLASS_MAPPINGS = {
     "CropTransparentAndResizeNode": CropTransparentAndResizeNode
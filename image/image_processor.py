@@ -1,7 +1,7 @@
-import os
-from PIL import Image
 import torch
-import numpy as np
+
+from . import kernels
+from .trace import ImageTrace
 
 class ImageProcessor:
     @classmethod
@@ -15,6 +15,11 @@ class ImageProcessor:
                 "max_side_space": ("INT", {"default": 0, "min": 0, "max": 2048}), # Control: Max side space
                 "allow_RGBA_output": (["false", "true"], {"default": "true"}),
             },
+            "optional": {
+                # 调试追踪：填写目录即保存中间图，留空则读取 ZKZ_TRACE_DIR，仍为空则关闭
+                "trace_dir": ("STRING", {"default": "", "multiline": False}),
+                "trace_every": ("INT", {"default": 0, "min": 0, "max": 100000}),  # 每 N 张保存一次，0 表示读取 ZKZ_TRACE_EVERY
+            },
         }
 
     RETURN_TYPES = ("IMAGE", "MASK")
@@ -22,159 +27,102 @@ class ImageProcessor:
     FUNCTION = "process_images"
     CATEGORY = "ZKZ/Image Tools"
 
-    def process_images(self, images, final_width, final_height, max_top_space, max_side_space, allow_RGBA_output):
+    def process_images(self, images, final_width, final_height, max_top_space, max_side_space, allow_RGBA_output, trace_dir="", trace_every=0):
         """
         Processes a batch of images.
-        """
-        output_images = []
-        output_masks = []
-
-        for i in range(images.shape[0]):  # Iterate through the batch
-            print(f"Processing image index: {i}")
-
-            # 1. Convert tensor to PIL image
-            print(f"  [tensor_to_pil] Input Tensor Shape: {images[i].shape}, Type: {images[i].dtype}") # DEBUG - Tensor Info
-            pil_image_before_conversion = tensor_to_pil(images[i])
-            print(f"  [tensor_to_pil] PIL Image Mode (after tensor_to_pil): {pil_image_before_conversion.mode}")  # DEBUG - Check mode
-            pil_image_before_conversion.save(f"debug_1_initial_pil_{i}.png")  # Save for inspection
-
-            image = pil_image_before_conversion # Use the saved image as input
-
-            # 2. Process the image
-            print(f"  [crop_and_resize_image] Input PIL Image Mode: {image.mode}") # Debug Mode In
-            image.save(f"debug_2_crop_resize_input_{i}.png") # Save input to crop_and_resize
-            image = self.crop_and_resize_image(image, final_width, final_height, max_top_space, max_side_space)
-            print(f"  [crop_and_resize_image] Output PIL Image Mode: {image.mode}") # Debug Mode Out
-            image.save(f"debug_3_crop_resize_output_{i}.png") # Save output of crop_and_resize
-
 
-            # 3. Convert back to tensor
-            print(f"  [pil_to_tensor] Input PIL Image Mode: {image.mode}") # Debug Mode In
-            image.save(f"debug_6_pil_to_tensor_input_{i}.png") # Save input to pil_to_tensor
-            # 生成遮罩（基于 alpha 通道）
-            mask_np = np.array(image.split()[-1]).astype(np.float32) / 255.0
-            mask_tensor = torch.from_numpy(mask_np).unsqueeze(0)  # (1, H, W)
-
-            output_tensor = pil_to_tensor(image, allow_RGBA_output == "true")
-            print(f"  [pil_to_tensor] Output Tensor Shape: {output_tensor.shape}, Type: {output_tensor.dtype}") # DEBUG - Tensor Info
-            output_images.append(output_tensor)
-            output_masks.append(mask_tensor)
-
-
-        # Concatenate the list of processed images into a single tensor.
-        output_images_tensor = torch.cat(output_images, dim=0)
-        output_masks_tensor = torch.cat(output_masks, dim=0)
-        print(f"Final Output Tensor Shape: {output_images_tensor.shape}, Type: {output_images_tensor.dtype}") # DEBUG - Final Tensor Shape
+        整批一次求出所有 alpha 包围框，按解析解直接算出每张图最终的尺寸与位置，
+        每张图只重采样一次，并直接写入预先分配好的 [B, final_height, final_width, 4] 输出。
+        裁剪后尺寸相同的图像会合并成一组一起缩放。
+        """
+        trace = ImageTrace.from_settings(trace_dir, trace_every)
+        images = kernels.ensure_rgba(images)
+        batch_size = images.shape[0]
+        for i in range(batch_size):
+            trace.capture("initial", i, images[i])
+
+        # 1. 一次归约求出整批的包围框，并按裁剪后尺寸分组（尺寸相同则布局相同）
+        bboxes = kernels.alpha_bbox(images)
+        groups = {}
+        for i, bbox in enumerate(bboxes):
+            if bbox is None:  # 完全透明时不裁剪
+                bbox = (0, 0, images.shape[2], images.shape[1])
+            size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+            groups.setdefault(size, []).append((i, bbox))
+
+        # 2. 每组只缩放一次，直接贴进预分配的输出
+        output_images_tensor = images.new_zeros((batch_size, final_height, final_width, 4))
+        for (width, height), members in groups.items():
+            new_width, new_height, x_offset, y_offset = self.solve_layout(
+                width, height, final_width, final_height, max_top_space, max_side_space
+            )
+            sources = [kernels.crop(images[i:i + 1], bbox) for i, bbox in members]
+            sources = sources[0] if len(sources) == 1 else torch.cat(sources, dim=0)
+            resized = kernels.resize(sources, new_height, new_width)
+            for j, (i, _) in enumerate(members):
+                kernels.paste(output_images_tensor[i:i + 1], resized[j:j + 1], x_offset, y_offset)
+
+        for i in range(batch_size):
+            trace.capture("crop_resize_output", i, output_images_tensor[i])
+
+        # 3. 生成遮罩（基于 alpha 通道）
+        output_masks_tensor = kernels.extract_alpha(output_images_tensor)
+        if allow_RGBA_output != "true":
+            output_images_tensor = output_images_tensor[..., :3]
 
         return (output_images_tensor, output_masks_tensor)
 
-    def crop_and_resize_image(self, img, final_width=850, final_height=1049, max_top_space=150, max_side_space=50):
-        """
-        裁剪透明部分，调整大小，并通过添加透明区域来达到目标像素尺寸，避免拉伸. 按照原比例最大化缩放到新建的画布内, 考虑max_top_space和max_side_space
+    @staticmethod
+    def solve_layout(width, height, final_width, final_height, max_top_space, max_side_space):
         """
-        print(f"    [crop_and_resize_image] Starting - Input Mode: {img.mode}")
-        img = img.convert("RGBA")  # 确保图像具有 Alpha 通道
-        print(f"    [crop_and_resize_image] Converted to RGBA - Mode: {img.mode}")
-
-        # 裁剪透明部分
-        bbox = img.getbbox()
-        if bbox:
-            img = img.crop(bbox)
-            print(f"    [crop_and_resize_image] Cropped - Mode: {img.mode}")
-        else:
-            print(f"    [crop_and_resize_image] No Bounding Box found (fully transparent?), skipping crop.")
-
-        width, height = img.size
-
-        # 创建新的透明画布
-        new_img = Image.new("RGBA", (final_width, final_height), (0, 0, 0, 0))
-        print(f"    [crop_and_resize_image] Created new RGBA image - Mode: {new_img.mode}, Size: {new_img.size}")
+        根据裁剪后的尺寸直接算出最终缩放尺寸与粘贴位置，返回 (new_width, new_height, x_offset, y_offset)。
 
+        先按画布最大化等比缩放并居中；顶部空间超过 max_top_space 时上移；
+        侧边空间不足 max_side_space 时再按比例缩小、固定侧边并重新垂直居中。
+        """
         # 计算初始缩放比例，仅考虑画布尺寸
-        width_ratio = final_width / width
-        height_ratio = final_height / height
-        initial_scale = min(width_ratio, height_ratio)
+        initial_scale = min(final_width / width, final_height / height)
+        new_width = max(1, int(width * initial_scale))
+        new_height = max(1, int(height * initial_scale))
 
-        new_width = int(width * initial_scale)
-        new_height = int(height * initial_scale)
-        resized_img = img.resize((new_width, new_height), Image.LANCZOS)
-        print(f"    [crop_and_resize_image] Initial Resized - Mode: {resized_img.mode}, Size: {resized_img.size}")
-
-
-        # 计算初始粘贴位置 (初始居中)
+        # 初始居中
         x_offset = (final_width - new_width) // 2
         y_offset = (final_height - new_height) // 2
 
-        # 粘贴图像
-        new_img.paste(resized_img, (x_offset, y_offset))
-        print(f"    [crop_and_resize_image] Pasted Initially - Mode: {resized_img.mode}, Offset: ({x_offset}, {y_offset})")
-
-        # 获取当前的顶部空间
-        top_space = y_offset
-
         # 调整顶部空间，只在顶部空间大于max_top_space时生效
-        if top_space > max_top_space and max_top_space > 0:  # 只有当 max_top_space 大于 0 时才调整
+        if y_offset > max_top_space and max_top_space > 0:  # 只有当 max_top_space 大于 0 时才调整
             y_offset = max_top_space
-            new_img = Image.new("RGBA", (final_width, final_height), (0, 0, 0, 0)) #创建新的画布
-            new_img.paste(resized_img, (x_offset, y_offset)) # 粘贴在新的位置
-            print(f"    [crop_and_resize_image] Adjusted Top Space - Mode: {resized_img.mode}, Offset: ({x_offset}, {y_offset})")
 
         # 调整侧边空间
-        side_space = x_offset
-        if side_space < max_side_space: # 如果侧边空间小于目标值，则缩放以满足侧边空间
-            scale_factor = (final_width - 2 * max_side_space) / (final_width - 2 * side_space)
-            new_width = int(new_width * scale_factor)
-            new_height = int(new_height * scale_factor)
-            resized_img = img.resize((new_width, new_height), Image.LANCZOS)
+        if x_offset < max_side_space: # 如果侧边空间小于目标值，则缩放以满足侧边空间
+            scale_factor = (final_width - 2 * max_side_space) / (final_width - 2 * x_offset)
+            new_width = max(1, int(new_width * scale_factor))
+            new_height = max(1, int(new_height * scale_factor))
             x_offset = max_side_space # 固定左右侧边为 max_side_space
             y_offset = (final_height - new_height) // 2 #重新居中
-            new_img = Image.new("RGBA", (final_width, final_height), (0, 0, 0, 0))
-            new_img.paste(resized_img, (x_offset, y_offset))
-            print(f"   [crop_and_resize_image] Adjusted Side Space - Mode: {resized_img.mode}, Size: {resized_img.size}, Offset: ({x_offset}, {y_offset})")
 
-        print(f"    [crop_and_resize_image] Ending - Output Mode: {new_img.mode}, Size: {new_img.size}")
-        return new_img
+        return new_width, new_height, x_offset, y_offset
+
+    def crop_and_resize_image(self, img, final_width=850, final_height=1049, max_top_space=150, max_side_space=50):
+        """
+        裁剪透明部分，调整大小，并通过添加透明区域来达到目标像素尺寸，避免拉伸. 按照原比例最大化缩放到新建的画布内, 考虑max_top_space和max_side_space
 
+        img 为单张 [1, H, W, 4] 张量，返回 [1, final_height, final_width, 4]。
+        """
+        img = kernels.ensure_rgba(img)  # 确保图像具有 Alpha 通道
 
+        # 裁剪透明部分
+        bbox = kernels.alpha_bbox(img)[0]
+        if bbox:  # 完全透明时不裁剪
+            img = kernels.crop(img, bbox)
+
+        new_width, new_height, x_offset, y_offset = self.solve_layout(
+            img.shape[2], img.shape[1], final_width, final_height, max_top_space, max_side_space
+        )
+        new_img = img.new_zeros((1, final_height, final_width, 4))
+        kernels.paste(new_img, kernels.resize(img, new_height, new_width), x_offset, y_offset)
+        return new_img
 
-# Helper functions to convert between PIL images and torch tensors
-def tensor_to_pil(img):
-    print(f"  [tensor_to_pil] Input Tensor Shape: {img.shape}, Type: {img.dtype}") # DEBUG - Tensor Info in helper
-    image = img.cpu().numpy()
-    image = np.clip(image * 255, 0, 255).astype(np.uint8)
-    # Permute to HWC format if necessary
-    if image.ndim == 3 and image.shape[0] in [3, 4]:
-        image = np.transpose(image, (1, 2, 0))
-
-    # 显式指定 mode 参数，根据通道数判断
-    if image.ndim == 3 and image.shape[-1] == 4: # HWC 格式，4通道
-        mode = "RGBA"
-    elif image.ndim == 3 and image.shape[-1] == 3: # HWC 格式，3通道
-        mode = "RGB"
-    elif image.ndim == 2: # 灰度图
-        mode = "L"
-    else:
-        mode = None # 让 PIL 自动判断, or could raise error
-
-    pil_image = Image.fromarray(image, mode=mode) # 添加 mode 参数
-    print(f"  [tensor_to_pil] Output PIL Image Mode: {pil_image.mode}, Size: {pil_image.size}") # DEBUG - PIL Image Info in helper
-    return pil_image
-
-def pil_to_tensor(img, allow_rgba=True):
-    print(f"  [pil_to_tensor] Input PIL Image Mode: {img.mode}, Size: {img.size}") # DEBUG - PIL Image Info in helper
-    if allow_rgba:
-        img = img.convert("RGBA")
-        print(f"  [pil_to_tensor] Converted to RGBA - Mode: {img.mode}") # Debug Mode after convert
-    else:
-        img = img.convert("RGB")
-        print(f"  [pil_to_tensor] Converted to RGB - Mode: {img.mode}") # Debug Mode after convert
-
-    numpy_image = np.array(img).astype(np.float32) / 255.0  # Normalize
-    numpy_image = np.clip(numpy_image, 0.0, 1.0)  # Ensure values in [0, 1]
-
-    tensor = torch.from_numpy(numpy_image).unsqueeze(0)  # Add batch dimension
-    print(f"  [pil_to_tensor] Output Tensor Shape: {tensor.shape}, Type: {tensor.dtype}") # DEBUG - Tensor Info in helper
-    return tensor
 
 NODE_CLASS_MAPPINGS = {
     "ImageProcessor": ImageProcessor
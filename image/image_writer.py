@@ -0,0 +1,144 @@
+"""
+后台图像编码/写盘线程池，供保存类节点共用。
+
+节点在主执行线程上只把帧量化为 uint8 并交给写入器，PNG 压缩等耗时的编码在后台完成，
+下一个队列任务不必等待磁盘。排队中的帧数有上限（背压），超过时 submit 会阻塞直到有帧写完。
+每个文件先写入同目录的临时文件并 fsync，再 os.replace 到目标路径：
+“Saved image” 日志打印时文件已完整落盘，读者也不会看到写了一半的图片。
+"""
+
+import os
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+from PIL import Image
+
+from ..basic.file_utils import atomic_write
+from ..basic.file_allocator import release_claim
+
+PIL_FORMATS = {"png": "PNG", "jpg": "JPEG", "jpeg": "JPEG", "webp": "WEBP"}
+
+_MAX_WORKERS = min(4, os.cpu_count() or 1)
+_MAX_PENDING = 16
+# 量化时每块浮点临时张量的上限（字节）
+_QUANTIZE_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def quantize_frames(images, indices=None):
+    """
+    把 [B, H, W, C] 浮点批次量化为 uint8 numpy 数组，单通道时去掉通道维。
+    indices 为帧序号列表时只量化这些帧（按给定顺序），未选中的帧不做任何计算。
+
+    结果张量一次分配好，按块计算 x*255 并原地 clamp 后直接写入（取整方式与 .to(torch.uint8) 相同），
+    峰值内存为 uint8 结果加一块浮点临时张量，而不是整批的浮点副本。
+    返回的数组与 CPU 上的结果张量共享内存，frames[i] 是连续的视图，可直接交给编码器。
+    """
+    count = images.shape[0] if indices is None else len(indices)
+    out = torch.empty((count, *images.shape[1:]), dtype=torch.uint8)
+    frame_bytes = max(1, images[0].numel() * images.element_size()) if images.shape[0] else 1
+    step = max(1, _QUANTIZE_CHUNK_BYTES // frame_bytes)
+    for start in range(0, count, step):
+        if indices is None:
+            source = images[start:start + step]
+        else:
+            source = images[list(indices[start:start + step])]
+        chunk = source.mul(255).clamp_(0, 255)
+        out[start:start + step].copy_(chunk)
+        del source, chunk
+    frames = out.numpy()
+    if frames.shape[-1] == 1:
+        frames = frames[..., 0]
+    return frames
+
+
+def encode_options(file_type, png_compress_level=6, quality=0):
+    """按格式生成 PIL save 参数；quality 为 0 时使用 PIL 的默认质量。"""
+    if file_type == "png":
+        return {"compress_level": int(png_compress_level)}
+    if file_type in ("jpg", "jpeg", "webp") and quality:
+        return {"quality": int(quality)}
+    return {}
+
+
+class ImageWriter:
+    def __init__(self, max_workers=_MAX_WORKERS, max_pending=_MAX_PENDING):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="zkz-image-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = {}  # 目标路径 -> Future
+
+    def submit(self, array, path, file_type, options=None, label="", claimed=False):
+        """
+        提交一帧 uint8 数组 ([H, W] 或 [H, W, C]) 的写入任务，返回 Future（结果为写入的路径）。
+        排队帧数达到上限时阻塞等待。同一路径的多次写入按提交顺序完成。
+        claimed 为 True 表示 path 由 allocate_path 分配，写入结束后（无论成功与否）释放其认领文件。
+        """
+        self._slots.acquire()
+        with self._lock:
+            previous = self._pending.get(path)
+            try:
+                future = self._pool.submit(self._write, array, path, file_type, options or {}, label, previous, claimed)
+            except BaseException:
+                self._slots.release()
+                if claimed:
+                    release_claim(path)
+                raise
+            self._pending[path] = future
+        future.add_done_callback(lambda f, p=path: self._finish(p, f))
+        return future
+
+    def _finish(self, path, future):
+        with self._lock:
+            if self._pending.get(path) is future:
+                del self._pending[path]
+        self._slots.release()
+
+    @staticmethod
+    def _write(array, path, file_type, options, label, previous, claimed):
+        if previous is not None:
+            # 先提交的同路径写入必然已被取出执行，等待它完成以保证最终内容是最后一次提交的
+            try:
+                previous.result()
+            except Exception:
+                pass
+
+        try:
+            image = Image.fromarray(array)
+            if PIL_FORMATS[file_type] == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            with atomic_write(path, fsync=True) as f:
+                image.save(f, format=PIL_FORMATS[file_type], **options)
+        except BaseException as e:
+            print(f"Failed to save image {label}to: {path}: {e}")
+            raise
+        finally:
+            if claimed:
+                release_claim(path)
+        print(f"Saved image {label}to: {path}")
+        return path
+
+    def flush(self, timeout=None):
+        """等待当前所有排队的写入完成。"""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_image_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ImageWriter()
+            # 进程退出前把排队中的图片写完
+            atexit.register(_writer.flush)
+        return _writer
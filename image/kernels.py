@@ -0,0 +1,132 @@
+"""
+张量原生的图像基础算子，直接作用于 ComfyUI 的 [B, H, W, C] 浮点批次。
+
+各图像节点共用这些算子，避免 tensor -> uint8 PIL -> tensor 的来回转换与整帧拷贝。
+裁剪返回视图（零拷贝），只有尺寸真正改变的操作（补边、缩放）才会分配新张量。
+"""
+
+import torch
+import torch.nn.functional as F
+
+
+def ensure_rgba(images):
+    """确保批次为 4 通道；RGB 补不透明 alpha，灰度先扩展为 RGB。已是 RGBA 时原样返回。"""
+    channels = images.shape[-1]
+    if channels == 4:
+        return images
+    if channels == 1:
+        images = images.expand(*images.shape[:-1], 3)
+    alpha = torch.ones_like(images[..., :1])
+    return torch.cat([images[..., :3], alpha], dim=-1)
+
+
+def extract_alpha(images):
+    """返回 [B, H, W] 的 alpha 通道视图；没有 alpha 时视为全不透明。"""
+    if images.shape[-1] == 4:
+        return images[..., 3]
+    return torch.ones(images.shape[:-1], dtype=images.dtype, device=images.device)
+
+
+def alpha_bbox(images, margin=0):
+    """
+    一次归约求出整批图像非透明区域的包围框。
+
+    判定与 PIL getbbox 在 uint8 alpha 上的“非零”一致。
+    返回长度为 B 的列表，元素为 (left, top, right, bottom)，已按 margin 外扩并裁到图像范围内；
+    完全透明的图像返回 None；没有 alpha 通道时整帧都视为内容，返回整幅图像的范围。
+    """
+    batch, height, width = images.shape[0], images.shape[1], images.shape[2]
+    if images.shape[-1] != 4:
+        return [(0, 0, width, height)] * batch
+
+    opaque = images[..., 3] * 255 >= 1
+    rows = opaque.any(dim=2).to(torch.uint8)  # [B, H]
+    cols = opaque.any(dim=1).to(torch.uint8)  # [B, W]
+    has_content = rows.any(dim=1)
+
+    top = rows.argmax(dim=1)
+    bottom = height - rows.flip(1).argmax(dim=1)
+    left = cols.argmax(dim=1)
+    right = width - cols.flip(1).argmax(dim=1)
+
+    bboxes = []
+    for i, (l, t, r, b) in enumerate(zip(left.tolist(), top.tolist(), right.tolist(), bottom.tolist())):
+        if not has_content[i]:
+            bboxes.append(None)
+            continue
+        bboxes.append((
+            max(0, l - margin),
+            max(0, t - margin),
+            min(width, r + margin),
+            min(height, b + margin),
+        ))
+    return bboxes
+
+
+def union_bbox(bboxes):
+    """合并多个包围框；全部为 None 时返回 None。"""
+    valid = [bbox for bbox in bboxes if bbox is not None]
+    if not valid:
+        return None
+    return (
+        min(bbox[0] for bbox in valid),
+        min(bbox[1] for bbox in valid),
+        max(bbox[2] for bbox in valid),
+        max(bbox[3] for bbox in valid),
+    )
+
+
+def crop(images, bbox):
+    """按 (left, top, right, bottom) 裁剪，返回视图，不复制像素。"""
+    left, top, right, bottom = bbox
+    return images[:, top:bottom, left:right, :]
+
+
+def pad(images, top=0, bottom=0, left=0, right=0, value=0.0):
+    """向四周补边，补出的区域填充 value（RGBA 时默认即全透明）。"""
+    batch, height, width, channels = images.shape
+    out = images.new_full((batch, height + top + bottom, width + left + right, channels), value)
+    out[:, top:top + height, left:left + width, :] = images
+    return out
+
+
+def paste(canvas, images, x, y):
+    """把 images 原地贴到 canvas 的 (x, y) 处，超出画布的部分自动裁掉。返回 canvas。"""
+    canvas_h, canvas_w = canvas.shape[1], canvas.shape[2]
+    height, width = images.shape[1], images.shape[2]
+
+    dst_left, dst_top = max(0, x), max(0, y)
+    dst_right, dst_bottom = min(canvas_w, x + width), min(canvas_h, y + height)
+    if dst_right <= dst_left or dst_bottom <= dst_top:
+        return canvas
+
+    src_left, src_top = dst_left - x, dst_top - y
+    canvas[:, dst_top:dst_bottom, dst_left:dst_right, :] = images[
+        :, src_top:src_top + (dst_bottom - dst_top), src_left:src_left + (dst_right - dst_left), :
+    ]
+    return canvas
+
+
+def resize(images, height, width, mode="bicubic"):
+    """
+    缩放到 (height, width)。
+
+    默认使用带抗锯齿的 bicubic，效果接近 PIL 的 LANCZOS；mode="nearest" 时不做抗锯齿。
+    RGBA 与 PIL 一样按预乘 alpha 插值，避免透明区域的颜色渗到边缘。
+    """
+    if images.shape[1] == height and images.shape[2] == width:
+        return images
+    if mode == "nearest":
+        resized = F.interpolate(images.movedim(-1, 1), size=(height, width), mode="nearest")
+        return resized.movedim(1, -1).contiguous()
+
+    premultiply = images.shape[-1] == 4
+    if premultiply:
+        alpha = images[..., 3:]
+        images = torch.cat([images[..., :3] * alpha, alpha], dim=-1)
+    resized = F.interpolate(images.movedim(-1, 1), size=(height, width), mode=mode, align_corners=False, antialias=True)
+    resized = resized.clamp_(0.0, 1.0).movedim(1, -1).contiguous()
+    if premultiply:
+        alpha = resized[..., 3:]
+        resized[..., :3] = torch.where(alpha > 0, resized[..., :3] / alpha.clamp(min=1e-6), 0.0).clamp_(0.0, 1.0)
+    return resized
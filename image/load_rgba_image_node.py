@@ -4,8 +4,118 @@ from PIL import Image
 import requests
 from io import BytesIO
 import os
+import glob
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import folder_paths
 
+from ..api import http_session
+from ..api.response_cache import cache_key, get_response_cache
+from ..basic.file_utils import image_sort_key
+
+# 解码结果的内存缓存上限（MB），按张量实际占用计算
+_MEMORY_CACHE_BYTES = int(float(os.environ.get("ZKZ_RGBA_CACHE_MB", "512")) * 1024 * 1024)
+
+
+class _DecodedCache:
+    """已解码 (image, mask) 张量的内存 LRU，按总字节数淘汰；超过上限的单张图片不缓存。"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(value):
+        return sum(t.numel() * t.element_size() for t in value)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = self._size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= self._size(previous)
+            self._entries[key] = value
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= self._size(evicted)
+
+
+_decoded_cache = _DecodedCache(_MEMORY_CACHE_BYTES)
+
+
+def _fetch_url(url):
+    """
+    下载 URL 内容，经共享 HTTP 会话（长连接、失败重试）。
+
+    响应带 ETag / Last-Modified 时把内容存入磁盘缓存；再次请求时带上 If-None-Match / If-Modified-Since，
+    服务端返回 304 则直接使用缓存。网络出错但有缓存时退回缓存内容。
+    """
+    cache = get_response_cache()
+    body_key = cache_key("rgba_url", url)
+    meta_key = cache_key("rgba_url_meta", url)
+    cached = cache.get(body_key)
+    validators = {}
+    if cached is not None:
+        validators = json.loads(cache.get_text(meta_key) or "{}")
+
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    try:
+        response = http_session.get(url, timeout=20, headers=headers)
+    except requests.RequestException as e:
+        if cached is None:
+            raise
+        cache.record("rgba_url", True)
+        print(f"请求URL失败（{e}），使用缓存: {url}")
+        return cached
+
+    if response.status_code == 304 and cached is not None:
+        cache.touch(body_key)
+        cache.touch(meta_key)
+        cache.record("rgba_url", True)
+        print(f"URL未变化（304），使用缓存: {url} ({cache.stats('rgba_url')})")
+        return cached
+
+    response.raise_for_status()
+    cache.record("rgba_url", False)
+    data = response.content
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    if validators["etag"] or validators["last_modified"]:
+        cache.put(body_key, data)
+        cache.put_text(meta_key, json.dumps(validators))
+    return data
+
+
+def _to_tensors(pil_image):
+    out_image_np = np.array(pil_image, dtype=np.float32) / 255.0
+    image_tensor_rgba = torch.from_numpy(out_image_np)[None,]
+    # 提取alpha通道作为mask
+    mask_tensor_alpha = image_tensor_rgba[:, :, :, 3].clone()
+    return image_tensor_rgba, mask_tensor_alpha
+
+
 class LoadRGBALocalOrURL:
     @classmethod
     def INPUT_TYPES(s):
@@ -13,18 +123,20 @@ class LoadRGBALocalOrURL:
             "required": {
                 "image_path_or_url": ("STRING", {
                     "default": "",
-                    "multiline": False,
-                    "placeholder": "URL或本地路径，支持PNG透明图像"
+                    "multiline": True,
+                    "placeholder": "URL或本地路径，支持PNG透明图像；每行一个，本地路径可用通配符（如 sprites/*.png）"
                 })
             },
             "optional": {
                 # ComfyUI使用BOOLEAN而不是具体的上传组件类型
-                "local_file": ("BOOLEAN", {"default": False, "label": "从本地文件加载"})
+                "local_file": ("BOOLEAN", {"default": False, "label": "从本地文件加载"}),
+                # 多张图片时同时下载/解码的数量
+                "workers": ("INT", {"default": 4, "min": 1, "max": 32}),
             }
         }
 
-    RETURN_TYPES = ("IMAGE", "MASK")
-    RETURN_NAMES = ("image_rgba", "mask_alpha")
+    RETURN_TYPES = ("IMAGE", "MASK", "STRING")
+    RETURN_NAMES = ("image_rgba", "mask_alpha", "status")
     FUNCTION = "load_image_main"
     CATEGORY = "ZKZ/Image Tools"
 
@@ -33,65 +145,138 @@ class LoadRGBALocalOrURL:
         mask_tensor_alpha = torch.zeros((1, 1, 1), dtype=torch.float32)
         return (image_tensor_rgba, mask_tensor_alpha)
 
-    def load_image_main(self, image_path_or_url, local_file=False):
-        pil_image = None
-        source_info = "unknown source"
+    @staticmethod
+    def _resolve_local_path(path, local_file):
+        resolved_path = path
+        if local_file:
+            # 如果是相对路径，尝试在ComfyUI的输入目录中查找
+            if not os.path.isabs(path):
+                input_dir = folder_paths.get_input_directory()
+                possible_path = os.path.join(input_dir, path)
+                if os.path.exists(possible_path):
+                    resolved_path = possible_path
+
+        if not os.path.exists(resolved_path):
+            # 尝试使用ComfyUI的路径解析
+            try:
+                resolved_path = folder_paths.get_annotated_filepath(path)
+            except:
+                pass
+        return resolved_path
+
+    def load_one(self, path, local_file=False):
+        """
+        加载单张图像，返回 (image [1,H,W,4], mask [1,H,W])；失败时抛出异常。
+        解码结果按内容缓存在内存中：URL 按下载字节的哈希，本地文件按 (路径, mtime, 大小)。
+        """
+        if path.startswith("http://") or path.startswith("https://"):
+            # 从URL加载
+            data = _fetch_url(path)
+            key = ("url", hashlib.sha1(data).hexdigest())
+            cached = _decoded_cache.get(key)
+            if cached is not None:
+                return cached
+            pil_image = Image.open(BytesIO(data)).convert("RGBA")
+            print(f"成功从URL加载图像: {path}")
+        else:
+            # 从本地路径加载
+            resolved_path = self._resolve_local_path(path, local_file)
+            if not os.path.exists(resolved_path):
+                raise FileNotFoundError(f"找不到图像文件 '{path}'")
+
+            stat = os.stat(resolved_path)
+            key = ("file", os.path.realpath(resolved_path), stat.st_mtime_ns, stat.st_size)
+            cached = _decoded_cache.get(key)
+            if cached is not None:
+                return cached
+            pil_image = Image.open(resolved_path).convert("RGBA")
+            print(f"成功从本地加载图像: {resolved_path}")
+
+        result = _to_tensors(pil_image)
+        _decoded_cache.put(key, result)
+        return result
 
+    def expand_sources(self, text, local_file=False):
+        """每个非空行一项；含通配符的本地路径展开为匹配的文件（自然排序），没有匹配时保留原样以便报错。"""
+        sources = []
+        for line in text.splitlines():
+            path = line.strip()
+            if not path:
+                continue
+            if path.startswith("http://") or path.startswith("https://") or not glob.has_magic(path):
+                sources.append(path)
+                continue
+            pattern = path
+            if local_file and not os.path.isabs(path):
+                pattern = os.path.join(folder_paths.get_input_directory(), path)
+            matches = [m for m in glob.glob(pattern, recursive=True) if os.path.isfile(m)]
+            sources.extend(sorted(matches, key=image_sort_key) or [path])
+        return sources
+
+    @staticmethod
+    def assemble_batch(results):
+        """
+        把逐张结果居中补边到最大尺寸，拼成 [B,H,W,4] 与 [B,H,W]。
+        补出的区域完全透明；加载失败的项保留位置，为全透明帧。
+        """
+        loaded = [r for r in results if r is not None]
+        height = max((image.shape[1] for image, _ in loaded), default=1)
+        width = max((image.shape[2] for image, _ in loaded), default=1)
+        images = torch.zeros((len(results), height, width, 4), dtype=torch.float32)
+        masks = torch.zeros((len(results), height, width), dtype=torch.float32)
+        for i, result in enumerate(results):
+            if result is None:
+                continue
+            image, mask = result
+            h, w = image.shape[1], image.shape[2]
+            top, left = (height - h) // 2, (width - w) // 2
+            images[i, top:top + h, left:left + w] = image[0]
+            masks[i, top:top + h, left:left + w] = mask[0]
+        return images, masks
+
+    def load_image_main(self, image_path_or_url, local_file=False, workers=4):
         if not image_path_or_url or not image_path_or_url.strip():
             print("错误: 未提供图像路径或URL")
-            return self._empty_result()
-
-        path = image_path_or_url.strip()
-        source_info = f"路径/URL: {path}"
-
-        try:
-            if path.startswith("http://") or path.startswith("https://"):
-                # 从URL加载
-                response = requests.get(path, timeout=20)
-                response.raise_for_status()
-                img_bytes = BytesIO(response.content)
-                pil_image = Image.open(img_bytes).convert("RGBA")
-                print(f"成功从URL加载图像: {path}")
+            return self._empty_result() + ("error: 未提供图像路径或URL",)
+
+        sources = self.expand_sources(image_path_or_url, local_file)
+
+        def load(path):
+            try:
+                return self.load_one(path, local_file), None
+            except Exception as e:
+                print(f"加载图像时出错: {e}")
+                return None, e
+
+        if len(sources) == 1:
+            outcomes = [load(sources[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(sources)), thread_name_prefix="zkz-rgba") as pool:
+                outcomes = list(pool.map(load, sources))
+
+        status = []
+        for i, (path, (result, error)) in enumerate(zip(sources, outcomes)):
+            if error is None:
+                height, width = result[0].shape[1], result[0].shape[2]
+                status.append(f"[{i}] ok {width}x{height} {path}")
             else:
-                # 从本地路径加载
-                resolved_path = path
-                if local_file:
-                    # 如果是相对路径，尝试在ComfyUI的输入目录中查找
-                    if not os.path.isabs(path):
-                        input_dir = folder_paths.get_input_directory()
-                        possible_path = os.path.join(input_dir, path)
-                        if os.path.exists(possible_path):
-                            resolved_path = possible_path
-                
-                if not os.path.exists(resolved_path):
-                    # 尝试使用ComfyUI的路径解析
-                    try:
-                        resolved_path = folder_paths.get_annotated_filepath(path)
-                    except:
-                        pass
-                
-                if not os.path.exists(resolved_path):
-                    print(f"错误: 找不到图像文件 '{path}'")
-                    return self._empty_result()
-                
-                pil_image = Image.open(resolved_path).convert("RGBA")
-                print(f"成功从本地加载图像: {resolved_path}")
-        except Exception as e:
-            print(f"加载图像时出错: {e}")
-            return self._empty_result()
-
-        if pil_image is None:
-            print(f"错误: 无法从{source_info}加载图像。")
-            return self._empty_result()
-
-        # 转换为张量
-        out_image_np = np.array(pil_image, dtype=np.float32) / 255.0
-        image_tensor_rgba = torch.from_numpy(out_image_np)[None,]
-        # 提取alpha通道作为mask
-        mask_tensor_alpha = image_tensor_rgba[:, :, :, 3].clone()
+                status.append(f"[{i}] error: {error} {path}")
+        status = "\n".join(status)
+
+        if len(sources) == 1:
+            # 单张图片保持原有输出：不补边，失败时为 1x1 空图
+            result = outcomes[0][0]
+            if result is None:
+                return self._empty_result() + (status,)
+            image_tensor_rgba, mask_tensor_alpha = result
+        else:
+            image_tensor_rgba, mask_tensor_alpha = self.assemble_batch([result for result, _ in outcomes])
+            failed = sum(error is not None for _, error in outcomes)
+            if failed:
+                print(f"{failed}/{len(sources)} 张图像加载失败，对应位置为透明帧")
 
         print(f"图像加载成功，形状: {image_tensor_rgba.shape}，包含透明通道")
-        return (image_tensor_rgba, mask_tensor_alpha)
+        return (image_tensor_rgba, mask_tensor_alpha, status)
 
 # 添加节点映射
 NODE_CLASS_MAPPINGS = {
@@ -1,6 +1,4 @@
 import torch
-import numpy as np
-from PIL import Image
 
 class VrchIsolateColorNode:  # 类名改为更贴切的名称
     CATEGORY = "ZKZ/Image Tools"
@@ -30,35 +28,22 @@ class VrchIsolateColorNode:  # 类名改为更贴切的名称
         Returns:
             torch.Tensor: 处理后的 ComfyUI Image tensor.
         """
-        batch_size = image.shape[0]
-        output_images = []
-
-        for b in range(batch_size):
-            img_np = image[b].cpu().numpy()
-            img_pil = Image.fromarray((img_np * 255).astype(np.uint8)).convert("RGBA")
-            pixels = img_pil.load()
-
-            for x in range(img_pil.width):
-                for y in range(img_pil.height):
-                    r, g, b, a = pixels[x, y]
-
-                    is_target_color = False # 标记是否为目标颜色 (黑色或白色)
-                    if isolate_color == "Black":
-                        if max(r, g, b) < threshold: # 使用改进后的黑色判断
-                            is_target_color = True
-                    elif isolate_color == "White":
-                        if min(r, g, b) > 255 - threshold: # 使用改进后的白色判断
-                            is_target_color = True
-
-                    if is_target_color:
-                        pixels[x, y] = (0, 0, 0, 0)  # RGBA: 透明  (如果是目标颜色，则透明)
-                    else:
-                        pass # 如果不是目标颜色，保持原样
-
-            output_img_np = np.array(img_pil).astype(np.float32) / 255.0
-            output_images.append(torch.from_numpy(output_img_np).unsqueeze(0))
-
-        output_tensor = torch.cat(output_images, dim=0)
+        # 整批一次性量化为 uint8，与原先逐像素 PIL 处理的取整方式一致（截断）
+        pixels = (image * 255).to(torch.uint8)
+        if pixels.shape[-1] == 3:
+            alpha = torch.full_like(pixels[..., :1], 255)
+            pixels = torch.cat([pixels, alpha], dim=-1)
+
+        rgb = pixels[..., :3]
+        if isolate_color == "Black":
+            target_mask = rgb.amax(dim=-1) < threshold  # 使用改进后的黑色判断
+        else:
+            target_mask = rgb.amin(dim=-1) > 255 - threshold  # 使用改进后的白色判断
+
+        # 目标颜色区域直接原地写为全透明 (0, 0, 0, 0)
+        pixels[target_mask] = 0
+
+        output_tensor = pixels.to(torch.float32) / 255.0
         return (output_tensor,)
 
 
@@ -1,10 +1,10 @@
 import os
 import folder_paths
-from PIL import Image
-import numpy as np
 from datetime import datetime
 from datetime import date
-import torch
+
+from .image_writer import get_image_writer, encode_options, quantize_frames
+from ..basic.file_allocator import allocate_path, next_numeric_index
 
 class VrchSaveImageNode:
     @classmethod
@@ -22,12 +22,19 @@ class VrchSaveImageNode:
                 "use_date_in_filename": (["True", "False"], {"default": "False"}),
                 "use_time_in_filename": (["True", "False"], {"default": "False"}),
              },
+            "optional": {
+                "png_compress_level": ("INT", {"default": 6, "min": 0, "max": 9}),
+                # 0 表示使用 PIL 的默认质量（JPEG 75 / WebP 80）
+                "quality": ("INT", {"default": 0, "min": 0, "max": 100}),
+                # async：交给后台写入线程后立即返回；sync：等待全部写完再返回
+                "write_mode": (["async", "sync"], {"default": "async"}),
+            },
         }
     RETURN_TYPES = ("IMAGE",)
     FUNCTION = "save_image"
     CATEGORY = "ZKZ/Image Tools"
 
-    def save_image(self, image, base_save_path, filename_prefix, filename_suffix, file_type, overwrite_if_exists, folder_suffix, use_date_folder, use_date_in_filename, use_time_in_filename):
+    def save_image(self, image, base_save_path, filename_prefix, filename_suffix, file_type, overwrite_if_exists, folder_suffix, use_date_folder, use_date_in_filename, use_time_in_filename, png_compress_level=6, quality=0, write_mode="async"):
         # --- 路径构建部分 (保持不变) ---
         if base_save_path:
             real_base_path = base_save_path
@@ -47,7 +54,13 @@ class VrchSaveImageNode:
             os.makedirs(save_path, exist_ok=True)
 
         file_type = file_type.lower()
-            
+        writer = get_image_writer()
+        options = encode_options(file_type, png_compress_level, quality)
+        futures = []
+
+        # 整批一次量化为 uint8，后台线程只负责编码与写盘
+        frames = quantize_frames(image)
+
         # --- 文件名构建逻辑 ---
         filename_parts = []
         if filename_prefix:
@@ -65,7 +78,7 @@ class VrchSaveImageNode:
         if base_filename:
             # --- 策略一：使用前缀/日期/时间命名 ---
             is_batch = len(image) > 1
-            for i, single_image in enumerate(image):
+            for i in range(len(frames)):
                 # 核心改动：仅在批处理时添加数字后缀
                 if is_batch:
                     filename = f"{base_filename}_{i:04}"
@@ -74,46 +87,34 @@ class VrchSaveImageNode:
 
                 full_path = os.path.join(save_path, f"{filename}.{file_type}")
                 
-                # 现在覆盖逻辑能正确工作了
-                if overwrite_if_exists == "False" and os.path.exists(full_path):
-                    counter = 1
-                    while True:
-                        new_filename = f"{filename}_{counter:04}.{file_type}"
-                        new_full_path = os.path.join(save_path, new_filename)
-                        if not os.path.exists(new_full_path):
-                            full_path = new_full_path
-                            break
-                        counter += 1
-                
-                # --- 图像转换和保存逻辑 ---
-                img_tensor = single_image.unsqueeze(0)
-                img_np = (img_tensor * 255).clamp(0, 255).to(torch.uint8).cpu().numpy()[0]
-                if img_np.shape[2] == 1: img_np = np.squeeze(img_np, axis=-1)
-                img_pil = Image.fromarray(img_np)
-                img_pil.save(full_path)
-                print(f"Saved image ({i+1}/{len(image)}) to: {full_path}")
+                # 不覆盖时依次尝试 name、name_0001、name_0002 ...，由分配器缓存编号并独占创建
+                if overwrite_if_exists == "False":
+                    full_path = allocate_path(
+                        save_path,
+                        lambda n, stem=filename: f"{stem}.{file_type}" if n == 0 else f"{stem}_{n:04}.{file_type}",
+                        ("suffix", filename, file_type),
+                    )
+
+                futures.append(writer.submit(
+                    frames[i], full_path, file_type, options, f"({i+1}/{len(frames)}) ",
+                    claimed=overwrite_if_exists == "False",
+                ))
         else:
-            # --- 策略二：使用纯数字计数命名 (此逻辑保持不变) ---
-            try:
-                files = [f for f in os.listdir(save_path) if f.lower().endswith(f'.{file_type}')]
-                numeric_files = [int(f.split('.')[0]) for f in files if f.split('.')[0].isdigit()]
-                start_counter = max(numeric_files) + 1 if numeric_files else 0
-            except Exception as e:
-                print(f"扫描目录计数失败，从0开始。错误: {e}")
-                start_counter = 0
+            # --- 策略二：使用纯数字计数命名（起始编号为已有最大编号 + 1，每个目录只扫描一次）---
+            def seed_counter():
+                try:
+                    return next_numeric_index(save_path, file_type)
+                except Exception as e:
+                    print(f"扫描目录计数失败，从0开始。错误: {e}")
+                    return 0
 
-            for i, single_image in enumerate(image):
-                current_count = start_counter + i
-                filename = f"{current_count:04}.{file_type}"
-                full_path = os.path.join(save_path, filename)
-                
-                # --- 图像转换和保存逻辑 ---
-                img_tensor = single_image.unsqueeze(0)
-                img_np = (img_tensor * 255).clamp(0, 255).to(torch.uint8).cpu().numpy()[0]
-                if img_np.shape[2] == 1: img_np = np.squeeze(img_np, axis=-1)
-                img_pil = Image.fromarray(img_np)
-                img_pil.save(full_path)
-                print(f"Saved image ({i+1}/{len(image)}) to: {full_path}")
+            for i in range(len(frames)):
+                full_path = allocate_path(save_path, lambda n: f"{n:04}.{file_type}", ("numeric", file_type), seed=seed_counter)
+                futures.append(writer.submit(frames[i], full_path, file_type, options, f"({i+1}/{len(frames)}) ", claimed=True))
+
+        if write_mode == "sync":
+            for future in futures:
+                future.result()
 
         return (image,)
 
@@ -1,9 +1,6 @@
 import torch
-from PIL import Image
-import numpy as np
 
-# 复用image_processor.py中的辅助函数
-from .image_processor import tensor_to_pil, pil_to_tensor
+from . import kernels
 
 class StretchBottomNode:
     @classmethod
@@ -22,29 +19,23 @@ class StretchBottomNode:
     CATEGORY = "ZKZ/Image Tools"
 
     def stretch_images(self, images, stretch_pct, allow_RGBA_output):
-        output_images = []
-        for i in range(images.shape[0]):
-            pil_img = tensor_to_pil(images[i])
-            stretched = self.stretch_bottom(pil_img, stretch_pct)
-            tensor_img = pil_to_tensor(stretched, allow_RGBA_output == "true")
-            output_images.append(tensor_img)
-        output_images_tensor = torch.cat(output_images, dim=0)
-        return (output_images_tensor,)
+        stretched = self.stretch_bottom(kernels.ensure_rgba(images), stretch_pct)
+        if allow_RGBA_output != "true":
+            stretched = stretched[..., :3]
+        return (stretched,)
 
     @staticmethod
-    def stretch_bottom(img: Image.Image, pct: float) -> Image.Image:
+    def stretch_bottom(images: torch.Tensor, pct: float) -> torch.Tensor:
         if pct <= 0:
-            return img.copy()
-        width, height = img.size
+            return images
+        height = images.shape[1]
         extra_pixels = int(round(height * pct / 100.0))
         if extra_pixels == 0:
-            return img.copy()
-        bottom_row = img.crop((0, height - 1, width, height))
-        stretched = bottom_row.resize((width, extra_pixels), Image.NEAREST)
-        new_img = Image.new("RGBA", (width, height + extra_pixels), (0, 0, 0, 0))
-        new_img.paste(img, (0, 0))
-        new_img.paste(stretched, (0, height))
-        return new_img
+            return images
+        # 先补出底部空白，再用最后一行像素填满
+        stretched = kernels.pad(images, bottom=extra_pixels)
+        stretched[:, height:, :, :] = images[:, height - 1:height, :, :]
+        return stretched
 
 NODE_CLASS_MAPPINGS = {
     "StretchBottomNode": StretchBottomNode
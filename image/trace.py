@@ -0,0 +1,48 @@
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+# 环境变量：设置目录即开启追踪；采样间隔默认每张都保存
+TRACE_DIR_ENV = "ZKZ_TRACE_DIR"
+TRACE_EVERY_ENV = "ZKZ_TRACE_EVERY"
+
+
+class ImageTrace:
+    """
+    可选的中间结果追踪，用于调试图像节点。
+
+    未开启时 capture() 直接返回，不做任何文件 I/O 或字符串格式化；
+    开启后按 every 采样，把中间图保存为 {run_id}_{stage}_{index}.png。
+    """
+
+    def __init__(self, directory="", every=1):
+        self.directory = directory
+        self.every = max(1, int(every))
+        self.enabled = bool(directory)
+        self.run_id = time.strftime("%Y%m%d-%H%M%S") if self.enabled else ""
+
+    @classmethod
+    def from_settings(cls, trace_dir="", trace_every=0):
+        """节点输入优先，其次读取环境变量；两者都为空时返回关闭的追踪器。"""
+        directory = (trace_dir or "").strip() or os.environ.get(TRACE_DIR_ENV, "").strip()
+        if not directory:
+            return _DISABLED_TRACE
+        every = trace_every or os.environ.get(TRACE_EVERY_ENV, "") or 1
+        os.makedirs(directory, exist_ok=True)
+        return cls(directory, int(every))
+
+    def capture(self, stage, index, image):
+        """保存单张 [H, W, C] 张量；未开启或未命中采样时不做任何事。"""
+        if not self.enabled or index % self.every:
+            return
+        array = np.clip(image.detach().cpu().numpy() * 255, 0, 255).astype(np.uint8)
+        if array.ndim == 3 and array.shape[-1] == 1:
+            array = array[..., 0]
+        path = os.path.join(self.directory, f"{self.run_id}_{stage}_{index:05}.png")
+        Image.fromarray(array).save(path)
+        print(f"[ImageTrace] {stage} #{index} {tuple(image.shape)} -> {path}")
+
+
+_DISABLED_TRACE = ImageTrace()
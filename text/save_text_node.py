@@ -3,6 +3,9 @@ from datetime import datetime
 
 import folder_paths
 
+from ..basic.file_allocator import allocate_path, release_claim
+from ..basic.file_utils import write_text_atomic
+
 
 class ZKZSaveTextNode:
     """
@@ -49,16 +52,16 @@ class ZKZSaveTextNode:
                 return prefix
             return f"{prefix}{separator}{counter}" if separator else f"{prefix}{counter}"
 
-        counter = 0
-        while True:
-            candidate = os.path.join(base_path, f"{build_name(counter)}.txt")
-            if not os.path.exists(candidate):
-                target_path = candidate
-                break
-            counter += 1
+        target_path = allocate_path(
+            base_path,
+            lambda counter: f"{build_name(counter)}.txt",
+            ("text", prefix, separator, padding),
+        )
 
-        with open(target_path, "w", encoding="utf-8") as f:
-            f.write(text)
+        try:
+            write_text_atomic(target_path, text)
+        finally:
+            release_claim(target_path)
 
         print(f"[ZKZ Save Text] Saved text ({len(text)} chars) to: {target_path}")
         return (text,)
@@ -1,19 +1,152 @@
 # 文件名: sequential_reader_node.py (最终修正版)
 
 import os
+import struct
 import uuid  # 导入uuid库来生成唯一ID
+import threading
+from array import array
+from collections import OrderedDict
+
+from ..basic.file_utils import atomic_write
+from ..basic.simple_load_image_batch import SimpleDB
+
+
+class LineIndex:
+    """
+    大文件的非空行索引：只保存每个非空行起始位置的字节偏移（array 存储，每行 8 字节），
+    读取第 N 行时才打开文件 seek 到该位置读一行，不把整个文件读入内存。
+
+    不长期持有文件句柄或映射：Windows 上编辑器可以照常保存、替换文件，
+    POSIX 上原地截断文件也不会让进程因访问失效的映射而崩溃（SIGBUS）。
+
+    索引持久化在 <file>.lineidx 中，并以源文件的大小与 mtime 校验，重启后可直接复用。
+    """
+
+    MAGIC = b"ZKZLIDX2"
+    HEADER = struct.Struct("<8sQQ")  # magic, 源文件大小, 源文件 mtime_ns
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.index_path = file_path + ".lineidx"
+        stat = os.stat(file_path)
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.offsets = self._load_index()
+        if self.offsets is None:
+            self.offsets = self._build_index()
+            self._save_index()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, n):
+        with open(self.file_path, "rb") as f:
+            f.seek(self.offsets[n])
+            raw = f.readline()
+        # 与建立索引时一致：单独的 \r 也是行结束符
+        return raw.split(b"\r", 1)[0].decode("utf-8", errors="replace").strip()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                header = f.read(self.HEADER.size)
+                if len(header) != self.HEADER.size:
+                    return None
+                magic, size, mtime_ns = self.HEADER.unpack(header)
+                if magic != self.MAGIC or size != self.size or mtime_ns != self.mtime_ns:
+                    return None
+                offsets = array("Q")
+                offsets.frombytes(f.read())
+                return offsets
+        except (OSError, ValueError):
+            return None
+
+    def _build_index(self):
+        offsets = array("Q")
+        position = 0
+        with open(self.file_path, "rb") as f:
+            for raw in f:
+                # 与内存模式（文本模式的通用换行）一致：单独的 \r 也是行结束符
+                pieces = raw.split(b"\r") if b"\r" in raw else (raw,)
+                start = position
+                for piece in pieces:
+                    stripped = piece.strip()
+                    # 去掉首尾空白（包括全角空格等 Unicode 空白）后为空的行不计入
+                    if stripped and (stripped[0] < 0x80 or stripped.decode("utf-8", errors="replace").strip()):
+                        offsets.append(start)
+                    start += len(piece) + 1
+                position += len(raw)
+        return offsets
+
+    def _save_index(self):
+        try:
+            with atomic_write(self.index_path) as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.size, self.mtime_ns))
+                self.offsets.tofile(f)
+        except OSError as e:
+            # 目录不可写时仍可使用内存中的索引，只是下次启动需要重新建立
+            print(f"警告 (顺序文本读取): 无法保存行索引 '{self.index_path}': {e}")
+
+
+# 已加载文件的 LRU 缓存：(绝对路径, 模式) -> (文件大小, mtime_ns, 行源)
+# 行源为 list（memory 模式）或 LineIndex（stream 模式），多个读取节点共享同一份
+_MAX_CACHED_FILES = 8
+_file_cache = OrderedDict()
+_file_cache_lock = threading.Lock()
+
+_cursor_db = None
+_cursor_db_lock = threading.Lock()
+
+
+def _get_cursor_db():
+    global _cursor_db
+    with _cursor_db_lock:
+        if _cursor_db is None:
+            _cursor_db = SimpleDB()
+        return _cursor_db
+
+
+def _load_lines(file_path, mode):
+    if mode == "stream":
+        return LineIndex(file_path)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def get_file_lines(file_path, mode):
+    """按 LRU 复用已加载的文件；文件被改写（大小或 mtime 变化）时重新加载。"""
+    key = (os.path.abspath(file_path), mode)
+    stat = os.stat(file_path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    with _file_cache_lock:
+        cached = _file_cache.get(key)
+        if cached is not None and cached[:2] == signature:
+            _file_cache.move_to_end(key)
+            return cached[2]
+
+        lines = _load_lines(file_path, mode)
+        _file_cache[key] = (signature[0], signature[1], lines)
+        _file_cache.move_to_end(key)
+        while len(_file_cache) > _MAX_CACHED_FILES:
+            _file_cache.popitem(last=False)
+        return lines
+
 
 class SequentialReaderNode:
     """
     一个ComfyUI节点，用于按顺序逐行读取文本文件。
     使用 IS_CHANGED 方法来确保每次队列运行时都会执行，解决了缓存问题。
+
+    memory 模式把所有非空行读入内存；stream 模式使用持久化的行偏移索引，按需 seek 读取单行，
+    适合数 GB 的大文件。seek_line 大于等于 0 且发生变化时，游标跳到该行。
+
+    游标按 (节点 unique_id, 文件路径) 分别保存并持久化，多个读取节点互不干扰；
+    上一次生效的 seek_line 与游标一起持久化，重启后不会因控件里的旧值把游标拉回去。
+    文件内容在节点之间通过 LRU 缓存共享，不会因交替读取而反复加载。
     """
-    _lines = []
-    _current_index = 0
-    _cached_filepath = None
 
     @classmethod
-    def IS_CHANGED(cls, file_path, reset):
+    def IS_CHANGED(cls, file_path, reset, **kwargs):
         """
         这个特殊方法用来告诉ComfyUI此节点的状态是否已更改。
         通过每次返回一个唯一的ID，我们强制ComfyUI在每个队列运行时都重新执行此节点。
@@ -34,6 +167,13 @@ class SequentialReaderNode:
                     "default": ""
                 }),
                 "reset": (["disable", "enable"],),
+            },
+            "optional": {
+                "mode": (["memory", "stream"], {"default": "memory"}),
+                "seek_line": ("INT", {"default": -1, "min": -1, "max": 0x7fffffffffffffff}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
 
@@ -42,39 +182,43 @@ class SequentialReaderNode:
     FUNCTION = "read_sequential_line"
     CATEGORY = "ZKZ/Text"
 
-    def read_sequential_line(self, file_path, reset):
+    def read_sequential_line(self, file_path, reset, mode="memory", seek_line=-1, unique_id=None):
         """
         核心逻辑函数。
         """
-        cls = self.__class__
-
-        # 仅在文件路径更改或手动重置时才重新加载文件和重置索引
-        if cls._cached_filepath != file_path or reset == "enable":
-            cls._cached_filepath = file_path
-            cls._current_index = 0
-            cls._lines = []
-            
-            if not os.path.exists(file_path):
-                print(f"警告 (顺序文本读取): 文件未找到于 '{file_path}'")
-                return {"ui": {"string": ["文件未找到!"]}, "result": ("",)}
-            
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    cls._lines = [line.strip() for line in f if line.strip()]
-            except Exception as e:
-                print(f"错误 (顺序文本读取): 读取文件时发生错误 '{file_path}': {e}")
-                return {"ui": {"string": ["文件读取错误!"]}, "result": ("",)}
-
-        if not cls._lines:
+        if not os.path.exists(file_path):
+            print(f"警告 (顺序文本读取): 文件未找到于 '{file_path}'")
+            return {"ui": {"string": ["文件未找到!"]}, "result": ("",)}
+
+        try:
+            lines = get_file_lines(file_path, mode)
+        except Exception as e:
+            print(f"错误 (顺序文本读取): 读取文件时发生错误 '{file_path}': {e}")
+            return {"ui": {"string": ["文件读取错误!"]}, "result": ("",)}
+
+        if not len(lines):
             return {"ui": {"string": ["文件为空!"]}, "result": ("",)}
 
-        if cls._current_index >= len(cls._lines):
-            cls._current_index = 0
+        state_key = (str(unique_id or "default"), os.path.abspath(file_path))
+        cursor_key = f"seq_reader|{state_key[0]}|{state_key[1]}"
+        seek_key = cursor_key + "|seek"
+        db = _get_cursor_db()
+
+        # 手动重置时回到第一行
+        current_index = 0 if reset == "enable" else db.get(cursor_key, 0)
+
+        # 随机跳转到第 seek_line 行（仅在该值变化时生效）
+        last_seek_line = db.get(seek_key, -1)
+        if seek_line >= 0 and seek_line != last_seek_line:
+            current_index = seek_line % len(lines)
+
+        if current_index >= len(lines):
+            current_index = 0
 
-        line_to_return = cls._lines[cls._current_index]
+        line_to_return = lines[current_index]
 
-        # 索引递增
-        cls._current_index = (cls._current_index + 1) % len(cls._lines)
+        # 索引递增，与本次的 seek_line 在同一个事务中写入
+        db.insert_many({cursor_key: (current_index + 1) % len(lines), seek_key: seek_line})
 
         return {"ui": {"string": [line_to_return]}, "result": (line_to_return,)}
 
@@ -1,4 +1,160 @@
+import os
 import re
+import glob
+import heapq
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from ..basic.file_utils import image_sort_key, write_text_atomic
+
+
+def _build_trie_pattern(words):
+    """
+    把一组普通词编译成前缀树形状的正则（如 red|rest -> re(?:d|st)）。
+
+    re 对长交替是逐个分支尝试，前缀树形状让每个位置只沿一条路径比较，
+    效果接近 Aho-Corasick 的单遍扫描。可选分组是贪婪的，因此同一位置总是取最长的词。
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def to_pattern(node):
+        # 压缩没有分叉的单链，减少分组嵌套
+        prefix = []
+        while "" not in node and len(node) == 1:
+            ch, node = next(iter(node.items()))
+            prefix.append(re.escape(ch))
+        branches = [re.escape(ch) + to_pattern(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            body = ""
+        elif len(branches) == 1:
+            body = branches[0]
+        else:
+            body = "(?:" + "|".join(branches) + ")"
+        if "" in node and body:
+            body = f"(?:{body})?"
+        return "".join(prefix) + body
+
+    return to_pattern(trie)
+
+
+class ReplacementRuleSet:
+    """
+    编译好的替换规则集合（每行一个 `旧词->新词`）。
+
+    两种语义：
+    - sequential：逐条规则依次作用于上一条的结果（与旧版行为一致），后面的规则能看到前面的替换结果。
+    - simultaneous：在原文上一次扫描完成全部替换，已替换出的文本不会再被其它规则匹配；
+      总是取最靠左的匹配，同一位置有多条规则可匹配时，普通匹配取最长的旧词，正则取排在前面的规则。
+    """
+
+    def __init__(self, replacement_rules, use_regex=False):
+        self.use_regex = use_regex
+        self.rules = []  # [(旧词或正则源码, 新词, 编译后的正则或 None)]
+
+        for line in replacement_rules.strip().split('\n'):
+            if "->" not in line:
+                continue
+            parts = line.split("->")
+            old_str = parts[0].strip()
+            new_str = parts[1].strip() if len(parts) > 1 else ""
+            if not old_str:
+                continue
+
+            if use_regex:
+                try:
+                    compiled = re.compile(old_str, flags=re.IGNORECASE)
+                except re.error:
+                    print(f"[UniversalReplacer] Regex Error: {old_str}")
+                    continue
+                self.rules.append((old_str, new_str, compiled))
+            else:
+                self.rules.append((old_str, new_str, None))
+
+        self._literal_map = {}
+        self._literal_pattern = None
+        if not use_regex and self.rules:
+            # 同一个旧词以第一条规则为准
+            for old_str, new_str, _ in self.rules:
+                self._literal_map.setdefault(old_str, new_str)
+            try:
+                self._literal_pattern = re.compile(_build_trie_pattern(self._literal_map))
+            except (re.error, RecursionError):
+                # 极端的嵌套前缀超出 re 的限制时退回按长度降序的普通交替
+                alternatives = sorted(self._literal_map, key=len, reverse=True)
+                self._literal_pattern = re.compile("|".join(re.escape(old) for old in alternatives))
+
+    def apply(self, text, mode="sequential"):
+        if not self.rules:
+            return text
+        if mode == "simultaneous":
+            if self.use_regex:
+                return self._apply_simultaneous_regex(text)
+            literal_map = self._literal_map
+            return self._literal_pattern.sub(lambda m: literal_map[m.group()], text)
+
+        for old_str, new_str, compiled in self.rules:
+            if compiled is not None:
+                try:
+                    text = compiled.sub(new_str, text)
+                except re.error:
+                    print(f"[UniversalReplacer] Regex Error: {old_str}")
+            else:
+                text = text.replace(old_str, new_str)
+        return text
+
+    def _apply_simultaneous_regex(self, text):
+        """
+        各条正则分别查找（保留 re 对字面前缀的快速搜索），再按起点合并：
+        堆里存每条规则的下一个候选匹配，被已选匹配覆盖的候选才从当前位置重新查找。
+        """
+        heap = []
+        for i, (_, _, compiled) in enumerate(self.rules):
+            match = compiled.search(text)
+            if match is not None:
+                heap.append((match.start(), i, match))
+        heapq.heapify(heap)
+
+        pieces = []
+        position = 0
+        while heap:
+            start, i, match = heapq.heappop(heap)
+            compiled = self.rules[i][2]
+            if start < position:
+                match = compiled.search(text, position) if position <= len(text) else None
+                if match is not None:
+                    heapq.heappush(heap, (match.start(), i, match))
+                continue
+
+            pieces.append(text[position:start])
+            try:
+                pieces.append(match.expand(self.rules[i][1]))
+            except re.error:
+                pieces.append(match.group())
+            if match.end() == start:
+                # 空匹配时前进一个字符，避免死循环
+                pieces.append(text[start:start + 1])
+                position = start + 1
+            else:
+                position = match.end()
+
+            match = compiled.search(text, position) if position <= len(text) else None
+            if match is not None:
+                heapq.heappush(heap, (match.start(), i, match))
+
+        pieces.append(text[position:])
+        return "".join(pieces)
+
+
+@functools.lru_cache(maxsize=64)
+def compile_replacement_rules(replacement_rules, use_regex=False):
+    """按规则文本缓存编译结果，规则不变时不再重复解析与编译。"""
+    return ReplacementRuleSet(replacement_rules, use_regex)
+
 
 # ==============================================================================
 # 节点: 通用文本替换
@@ -16,6 +172,8 @@ class UniversalTextReplacer:
             "optional": {
                 "replacement_rules": ("STRING", {"default": "", "multiline": True, "placeholder": "在此输入替换规则，每行一个。\n格式：旧词->新词\n\n例如：\nred->blue\nbad text->"}),
                 "use_regex": ("BOOLEAN", {"default": False, "label_on": "启用正则", "label_off": "普通匹配"}),
+                # sequential：规则依次作用（默认，旧版行为）；simultaneous：一次扫描同时替换
+                "match_mode": (["sequential", "simultaneous"], {"default": "sequential"}),
             }
         }
 
@@ -24,30 +182,118 @@ class UniversalTextReplacer:
     FUNCTION = "process_text"
     CATEGORY = "ZKZ/Text"
 
-    def process_text(self, text_input, replacement_rules="", use_regex=False):
+    def process_text(self, text_input, replacement_rules="", use_regex=False, match_mode="sequential"):
         if not text_input:
             return ("",)
 
-        result_text = text_input
-        
         if not replacement_rules or not replacement_rules.strip():
-            return (result_text,)
-
-        lines = replacement_rules.strip().split('\n')
-        for line in lines:
-            if "->" in line:
-                parts = line.split("->")
-                old_str = parts[0].strip()
-                new_str = parts[1].strip() if len(parts) > 1 else ""
-                
-                if not old_str: continue
-
-                if use_regex:
-                    try:
-                        result_text = re.sub(old_str, new_str, result_text, flags=re.IGNORECASE)
-                    except re.error:
-                        print(f"[UniversalReplacer] Regex Error: {old_str}")
+            return (text_input,)
+
+        rule_set = compile_replacement_rules(replacement_rules, bool(use_regex))
+        return (rule_set.apply(text_input, match_mode),)
+
+
+# ==============================================================================
+# 节点: 通用文本批量替换
+# ==============================================================================
+class UniversalTextReplacerBatch:
+    """
+    对一组文本一次性应用同一套替换规则。
+
+    文本来源二选一：填写 directory 时处理目录下匹配 file_pattern 的文本文件（按文件名自然排序），
+    否则处理输入的文本列表（例如批量加载图像输出的 .txt 内容列表）。
+    规则只编译一次，由线程池并行处理各条文本；结果以列表输出，下游节点逐条执行。
+    填写 output_directory 时，结果以原文件名（文本列表则为 00000.txt 起的序号）原子写入该目录，
+    与 directory 相同时即为原地覆盖。
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "replacement_rules": ("STRING", {"default": "", "multiline": True, "placeholder": "在此输入替换规则，每行一个。\n格式：旧词->新词"}),
+                "use_regex": ("BOOLEAN", {"default": False, "label_on": "启用正则", "label_off": "普通匹配"}),
+                "match_mode": (["sequential", "simultaneous"], {"default": "sequential"}),
+            },
+            "optional": {
+                "texts": ("STRING", {"multiline": True, "forceInput": True}),
+                "directory": ("STRING", {"default": ""}),
+                "file_pattern": ("STRING", {"default": "*.txt"}),
+                "output_directory": ("STRING", {"default": ""}),
+                "workers": ("INT", {"default": 4, "min": 1, "max": 64}),
+            }
+        }
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("处理后的文本", "文件路径")
+    OUTPUT_IS_LIST = (True, True)
+    FUNCTION = "process_batch"
+    CATEGORY = "ZKZ/Text"
+
+    def process_batch(self, replacement_rules, use_regex, match_mode, texts=None,
+                      directory=None, file_pattern=None, output_directory=None, workers=None):
+        # INPUT_IS_LIST 时所有输入都是列表，除 texts 外只取第一个值
+        replacement_rules = replacement_rules[0] if replacement_rules else ""
+        use_regex = bool(use_regex[0]) if use_regex else False
+        match_mode = match_mode[0] if match_mode else "sequential"
+        directory = (directory[0] if directory else "").strip()
+        file_pattern = (file_pattern[0] if file_pattern else "").strip() or "*.txt"
+        output_directory = (output_directory[0] if output_directory else "").strip()
+        workers = max(1, int(workers[0])) if workers else 4
+
+        if directory:
+            if not os.path.isdir(directory):
+                print(f"[UniversalReplacerBatch] Directory not found: {directory}")
+                return ([], [])
+            sources = sorted(
+                (path for path in glob.glob(os.path.join(glob.escape(directory), file_pattern), recursive=True) if os.path.isfile(path)),
+                key=image_sort_key,
+            )
+        else:
+            sources = [None] * len(texts or [])
+            if not sources:
+                return ([], [])
+
+        rule_set = None
+        if replacement_rules.strip():
+            rule_set = compile_replacement_rules(replacement_rules, use_regex)
+        if output_directory:
+            os.makedirs(output_directory, exist_ok=True)
+
+        def process_item(index):
+            source_path = sources[index]
+            try:
+                if source_path is None:
+                    text = texts[index] or ""
                 else:
-                    result_text = result_text.replace(old_str, new_str)
+                    with open(source_path, "r", encoding="utf-8") as f:
+                        text = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"[UniversalReplacerBatch] Failed to read '{source_path}': {e}")
+                return "", ""
+
+            if rule_set is not None and text:
+                text = rule_set.apply(text, match_mode)
+
+            if not output_directory:
+                return text, source_path or ""
+            # 保留相对 directory 的子目录结构，递归模式下不同子目录的同名文件不会互相覆盖
+            name = os.path.relpath(source_path, directory) if source_path is not None else f"{index:05}.txt"
+            target_path = os.path.join(output_directory, name)
+            try:
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                write_text_atomic(target_path, text)
+            except OSError as e:
+                print(f"[UniversalReplacerBatch] Failed to write '{target_path}': {e}")
+                return text, ""
+            return text, target_path
+
+        if workers == 1 or len(sources) == 1:
+            results = [process_item(i) for i in range(len(sources))]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(sources)), thread_name_prefix="zkz-text-replace") as pool:
+                results = list(pool.map(process_item, range(len(sources))))
 
-        return (result_text,)
+        print(f"[UniversalReplacerBatch] Processed {len(results)} texts" + (f" -> {output_directory}" if output_directory else ""))
+        return ([text for text, _ in results], [path for _, path in results])